@@ -10,6 +10,7 @@ if __name__ == '__main__':
     if test_connection():
         print('테이블 생성 시작...')
         Base.metadata.create_all(bind=engine)
+        models.install_profile_notify(engine)
         print('테이블 생성 완료')
     else:
         print('데이터베이스 연결 실패. 환경변수를 확인하세요.')
@@ -25,9 +25,10 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 # 데이터베이스 및 모델 import
 from database import engine, get_db, Base
-from models import User, UserProfile, UserAddress, Event, Gender, FcmToken
+from models import User, UserProfile, UserAddress, Event, Gender, FcmToken, install_profile_notify
 from auth import hash_password, verify_password
 from address_service import AddressService
+from route_state import get_route_state as read_route_state, get_route_summary, set_route_state
 
 app = FastAPI(title="Commute Assistant API", version="1.0.0")
 
@@ -56,6 +57,11 @@ async def startup_event():
                     print("✅ 데이터베이스 테이블 재생성 완료")
             except Exception as recreate_error:
                 print(f"❌ 테이블 재생성 실패: {recreate_error}")
+        try:
+            # route-scheduler용 NOTIFY 트리거 (없으면 scheduler는 주기적 재계획만 사용)
+            install_profile_notify(engine)
+        except Exception as e:
+            print(f"⚠️ 프로필 변경 알림 트리거 설치 실패: {e}")
     else:
         print("⚠️ 데이터베이스 연결 실패 - 일부 기능이 작동하지 않을 수 있습니다")
     try:
@@ -81,6 +87,16 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# route:state는 압축된 바이너리로 저장되므로 디코딩하지 않는 클라이언트 사용
+route_redis_client = redis.Redis(
+    connection_pool=redis.ConnectionPool(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', '6379')),
+        db=int(os.getenv('REDIS_DB', '0')),
+        password=os.getenv('REDIS_PASSWORD', None),
+    )
+)
+
 # 환경 변수로 가져온 Google Maps API 키 (한 번만 정의)
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
 
@@ -1189,12 +1205,18 @@ async def health_check():
 
 
 @app.get("/api/v1/route")
-async def get_route_state(user_id: int):
+async def get_route_state(user_id: int, summary_only: bool = False, include_polylines: bool = True):
     """
     Redis에 저장된 출근 경로 상태를 조회
+    summary_only=true면 depart_at/total_duration_sec 등 요약 필드만 반환
     """
-    key = f"route:state:{user_id}"
-    data = redis_client.get(key)
+    try:
+        if summary_only:
+            data = get_route_summary(route_redis_client, user_id)
+        else:
+            data = read_route_state(route_redis_client, user_id, include_polylines=include_polylines)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Invalid route data")
 
     if not data:
         raise HTTPException(
@@ -1202,10 +1224,7 @@ async def get_route_state(user_id: int):
             detail=f"No route data for user_id={user_id}"
         )
 
-    try:
-        return json.loads(data)
-    except json.JSONDecodeError:
-        return {"raw": data}
+    return data
 
 
 class RouteStateCreateRequest(BaseModel):
@@ -1241,11 +1260,7 @@ async def create_route_state(request: RouteStateCreateRequest, db: Session = Dep
     }
 
     key = f"route:state:{request.user_id}"
-    redis_client.set(
-        key,
-        json.dumps(payload),
-        ex=60 * 60,
-    )
+    set_route_state(route_redis_client, request.user_id, payload)
 
     return {"success": True, "key": key}
 
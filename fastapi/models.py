@@ -1,7 +1,7 @@
 """
 데이터베이스 모델
 """
-from sqlalchemy import Column, BigInteger, String, Integer, Boolean, Time, DateTime, ForeignKey, DECIMAL
+from sqlalchemy import Column, BigInteger, String, Integer, Boolean, Time, DateTime, ForeignKey, DECIMAL, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -47,6 +47,16 @@ class UserProfile(Base):
 
     user = relationship("User", back_populates="profile")
 
+    # route-scheduler가 commute_time 범위로 조회 (partial + covering)
+    __table_args__ = (
+        Index(
+            "ix_user_profile_commute_time",
+            "commute_time",
+            postgresql_include=["feedback_min"],
+            postgresql_where=text("commute_time IS NOT NULL"),
+        ),
+    )
+
 
 class UserAddress(Base):
     """사용자 주소 정보 테이블"""
@@ -87,3 +97,40 @@ class FcmToken(Base):
     platform = Column(String, default="android")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     active = Column(Boolean, default=True, server_default="true")
+
+
+# route-scheduler(src/route_kafka)가 LISTEN하는 채널 (database_utils.PROFILE_CHANNEL)
+PROFILE_CHANNEL = "user_profile_changed"
+
+PROFILE_NOTIFY_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_user_profile_changed()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{PROFILE_CHANNEL}', COALESCE(NEW.id, OLD.id)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_user_profile_changed') THEN
+        CREATE TRIGGER trg_user_profile_changed
+        AFTER INSERT OR UPDATE OR DELETE ON user_profile
+        FOR EACH ROW EXECUTE FUNCTION notify_user_profile_changed();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_user_address_changed') THEN
+        CREATE TRIGGER trg_user_address_changed
+        AFTER INSERT OR UPDATE OR DELETE ON user_address
+        FOR EACH ROW EXECUTE FUNCTION notify_user_profile_changed();
+    END IF;
+END $$;
+"""
+
+
+def install_profile_notify(bind):
+    """
+    프로필/주소 변경 시 route-scheduler에 NOTIFY하는 트리거 설치 (멱등)
+    create_all은 기존 테이블을 건너뛰므로 테이블 생성 후 매번 호출
+    """
+    with bind.begin() as conn:
+        conn.exec_driver_sql(PROFILE_NOTIFY_SQL)
@@ -0,0 +1,116 @@
+"""
+출근 경로 상태(route:state) Redis 저장 포맷
+route-worker(src/route_kafka/utils/redis_route.py)와 동일한 레이아웃을 사용
+
+route:state:{user_id}    HASH   : 요약 필드 + route (zlib 압축 JSON, polyline 제외)
+route:polyline:{user_id} STRING : 단계별 polyline 목록 (zlib 압축 JSON)
+"""
+import json
+import zlib
+from typing import Optional
+
+import redis
+
+SUMMARY_FIELDS = (
+    "user_id", "depart_at", "arrive_by",
+    "total_duration_sec", "feedback_min", "generated_at",
+)
+INT_FIELDS = ("user_id", "total_duration_sec", "feedback_min")
+ROUTE_TTL = 60 * 60
+
+
+def _key(user_id) -> str:
+    return f"route:state:{user_id}"
+
+
+def _polyline_key(user_id) -> str:
+    return f"route:polyline:{user_id}"
+
+
+def _pack(obj) -> bytes:
+    return zlib.compress(
+        json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    )
+
+
+def _unpack(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+def _decode_summary(values) -> dict:
+    summary = {
+        k: v.decode("utf-8") if v is not None else None
+        for k, v in zip(SUMMARY_FIELDS, values)
+    }
+    for k in INT_FIELDS:
+        if summary[k] is not None:
+            summary[k] = int(summary[k])
+    return summary
+
+
+def _get_legacy(client: redis.Redis, user_id) -> Optional[dict]:
+    """이전 포맷(JSON 문자열)으로 저장된 값 조회"""
+    data = client.get(_key(user_id))
+    return json.loads(data) if data else None
+
+
+def get_route_summary(client: redis.Redis, user_id) -> Optional[dict]:
+    """depart_at, total_duration_sec 등 요약 필드만 조회 (route 역직렬화 없음)"""
+    try:
+        values = client.hmget(_key(user_id), SUMMARY_FIELDS)
+    except redis.ResponseError:
+        legacy = _get_legacy(client, user_id)
+        return {k: legacy.get(k) for k in SUMMARY_FIELDS} if legacy else None
+
+    if all(v is None for v in values):
+        return None
+    return _decode_summary(values)
+
+
+def get_route_state(client: redis.Redis, user_id, include_polylines: bool = True) -> Optional[dict]:
+    """전체 경로 상태 조회, include_polylines=False면 polyline 키는 읽지 않음"""
+    try:
+        data = client.hgetall(_key(user_id))
+    except redis.ResponseError:
+        return _get_legacy(client, user_id)
+
+    if not data:
+        return None
+
+    payload = _decode_summary([data.get(k.encode()) for k in SUMMARY_FIELDS])
+    payload["route"] = _unpack(data[b"route"]) if data.get(b"route") else None
+
+    if include_polylines and payload["route"]:
+        raw = client.get(_polyline_key(user_id))
+        polylines = _unpack(raw) if raw else []
+        for segment, polyline in zip(payload["route"].get("segments", []), polylines):
+            segment["polyline"] = polyline
+    return payload
+
+
+def set_route_state(client: redis.Redis, user_id, payload: dict, ttl: int = ROUTE_TTL) -> None:
+    """경로 상태 저장 (polyline은 별도 키로 분리)"""
+    route = payload.get("route")
+
+    polylines = None
+    if route:
+        segments = route.get("segments", [])
+        polylines = [s.get("polyline") for s in segments]
+        route = {
+            **route,
+            "segments": [{k: v for k, v in s.items() if k != "polyline"} for s in segments],
+        }
+
+    mapping = {k: str(payload[k]) for k in SUMMARY_FIELDS if payload.get(k) is not None}
+    if route is not None:
+        mapping["route"] = _pack(route)
+
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(_key(user_id))
+    pipe.hset(_key(user_id), mapping=mapping)
+    pipe.expire(_key(user_id), ttl)
+    if polylines is not None:
+        pipe.set(_polyline_key(user_id), _pack(polylines), ex=ttl)
+    else:
+        pipe.delete(_polyline_key(user_id))
+    pipe.execute()
@@ -8,6 +8,8 @@ from io import StringIO
 import math
 import json
 
+from route_kafka.utils.redis_route import RedisRoute
+
 app = FastAPI(title='Service API')
 
 redis_host = os.getenv("REDIS_HOST")
@@ -19,6 +21,14 @@ redis_client = redis.Redis(
     port=redis_port,
     decode_responses=True
 )
+# route:state is a hash of zlib packed values, read it without decoding
+route_redis = RedisRoute(
+    redis.Redis(
+        host=redis_host,
+        port=redis_port,
+        decode_responses=False
+    )
+)
 s3 = boto3.client('s3')
 stations = []
 music_df = None
@@ -184,12 +194,11 @@ def get_route(user_id: str):
         param
             user_id : User's unique ID
     """
-    key = f'route:state:{user_id}'
-    data = redis_client.get(key)
+    data = route_redis.get(user_id)
 
     if not data:
         raise HTTPException(
             status_code=404,
             detail=f"No route data for user_id={user_id}"
         )
-    return json.loads(data)
\ No newline at end of file
+    return data
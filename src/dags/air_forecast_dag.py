@@ -7,6 +7,7 @@ from utils.air_forecast_load_s3 import save_raw_to_s3
 from utils.air_forecast_transform import transform_forecast
 from utils.air_kafka_producer import KafkaProducerUtils
 from utils.air_config import settings
+from utils.spark_submit_utils import available_now_task
 
 default_args = {
     "owner": "airflow",
@@ -19,6 +20,7 @@ with DAG(
     start_date=datetime(2025, 1, 1),
     schedule_interval="45 5,11,17,23 * * *",
     catchup=False,
+    max_active_runs=1,
     default_args=default_args,
     tags=["air-quality", "forecast"],
 ) as dag:
@@ -50,4 +52,5 @@ with DAG(
     raw = extract()
     save_raw(raw)
     transformed = transform(raw)
-    publish(transformed)
+    # Consume the published forecasts with the air-forecast pipeline, then free the cores
+    publish(transformed) >> available_now_task("air_forecast")
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from io import StringIO
 import pandas as pd
+import pyarrow.dataset as ds
 import os
 
 from airflow import DAG
@@ -17,12 +18,15 @@ S3_GENRE_FILTER_DATA = "genre_filter_list"
 def bring_data_from_s3(bucket_path, music_data, genre_filter_data, weather_code_data, **context):
     try:
         s3 = Basic_s3_utils()
-        music_data_path = bucket_path + '/' + music_data
-        music_df = s3.read(path=music_data_path)
-
         genre_data_path = bucket_path + '/' + genre_filter_data
-        genre_filter_df = s3.read(path=genre_data_path)
-        music_df = music_df[music_df['track_genre'].isin(genre_filter_df['genre_filter_list'])]
+        genre_filter_df = s3.read(path=genre_data_path, columns=['genre_filter_list'])
+
+        # 장르 필터는 parquet 읽기 단계에서 적용 (music_classified는 원본 컬럼을 그대로 유지)
+        music_data_path = bucket_path + '/' + music_data
+        music_df = s3.read(
+            path=music_data_path,
+            filter_expr=ds.field('track_genre').isin(genre_filter_df['genre_filter_list'].dropna().tolist()),
+        )
 
         weather_code_data_path = bucket_path + '/' + weather_code_data
         weather_code_df = s3.read(path=weather_code_data_path, input_type='csv')
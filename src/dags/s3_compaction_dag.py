@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+import pendulum
+from airflow import DAG
+from utils.spark_submit_utils import compaction_task
+
+# DAG Init
+# This DAG runs every day at 03:30 and compacts the hourly parquet of the previous day
+KST = pendulum.timezone("Asia/Seoul")
+with DAG(
+    dag_id = 'compact_hourly_parquet',
+    start_date=pendulum.datetime(2025, 1, 1, 0, 0, tz=KST),
+    schedule_interval="30 3 * * *",
+    catchup = False,
+    max_active_runs=1,
+    tags=["Daily", "s3", "compaction"],
+    default_args={
+        'retries' : 2,
+        'retry_delay' : timedelta(minutes=5)
+    },
+) as dag:
+
+    # Previous KST day : the data interval of this run starts at yesterday 03:30
+    day = "{{ data_interval_start.in_timezone('Asia/Seoul').strftime('%Y%m%d') }}"
+
+    # One task per table, a failed table is retried alone
+    compact_kma_weather = compaction_task('kma-weather', day)
+    compact_air_realtime = compaction_task('air-realtime', day)
+
+    compact_kma_weather >> compact_air_realtime
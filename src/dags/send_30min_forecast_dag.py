@@ -6,6 +6,7 @@ from utils.kafka_utils import Kafka_producer_utils
 from utils.preprocessing_utils import Preprocessing
 from utils.database_utils import Database_utils
 from utils.s3_utils import S3_utils
+from utils.spark_submit_utils import available_now_task
 import pendulum
 import logging
 from collections import defaultdict
@@ -84,4 +85,7 @@ with DAG(
         python_callable = request_and_send_api,
     )
 
-    send_forecast_kafka
+    # Consume the forecasts just sent with the forecast pipeline, then free the cores
+    run_forecast_batch = available_now_task('forecast')
+
+    send_forecast_kafka >> run_forecast_batch
@@ -3,6 +3,7 @@ from airflow.operators.python import PythonOperator
 
 from utils.kma_api_tool_utils import Kma_api_collector
 from utils.kafka_utils import Kafka_producer_utils
+from utils.spark_submit_utils import available_now_task
 
 import pendulum
 import logging
@@ -69,4 +70,7 @@ with DAG(
         python_callable = request_and_send_api,
     )
 
-    send_weather_kafka
+    # Consume the hour's burst with the weather pipeline, then free the cores
+    run_weather_batch = available_now_task('weather')
+
+    send_weather_kafka >> run_weather_batch
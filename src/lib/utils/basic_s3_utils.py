@@ -7,9 +7,11 @@ import logging
 import pyarrow.dataset as ds
 import pandas as pd
 import pyarrow as pa
-import io
+import pyarrow.parquet as pq
 import json
 
+from utils.s3_transfer_utils import upload_stream, csv_writer
+
 class Basic_s3_utils:
     """
         Common S3 utils using boto3.
@@ -37,7 +39,8 @@ class Basic_s3_utils:
 
     # Methods
     # Read Dataset From S3
-    def read(self, path, input_type = 'parquet', return_type = 'pandas_df'):
+    def read(self, path, input_type = 'parquet', return_type = 'pandas_df',
+             columns = None, filter_expr = None, batch_size = None):
         """
             Read and return Dataset from S3
             
@@ -47,6 +50,12 @@ class Basic_s3_utils:
                     [json, csv, parquet (default)]
                 return_type : The format type of returned dataset
                     [pandas_df (default), arrow_table]
+                columns : Columns to read, None for all
+                    (parquet only fetches these column chunks)
+                filter_expr : pyarrow.dataset expression, e.g. ds.field("genre").isin([...])
+                    (parquet skips the row groups whose statistics cannot match)
+                batch_size : Max rows per batch. When set, return an iterator of
+                    pandas_df / arrow RecordBatch instead of the whole dataset
         """
         
         # Check input data type
@@ -59,9 +68,20 @@ class Basic_s3_utils:
                 f"Supported: {supported_formats}"
             )
 
+        if return_type not in ('pandas_df', 'arrow_table'):
+            raise ValueError(
+                f"Unsupported return type: {return_type}. "
+                "Supported: pandas_df, arrow_table"
+            )
+
         # get read all data within path and format
         if input_fmt == "json":
-            return self._read_json(path, return_type)
+            if filter_expr is not None or batch_size is not None:
+                raise ValueError("filter_expr and batch_size are only supported for parquet and csv")
+            data = self._read_json(path, return_type)
+            if columns is None:
+                return data
+            return data[columns] if return_type == 'pandas_df' else data.select(columns)
 
         s3_uri = f"s3://{self.bucket}/{path}.{input_type}"
         dataset = ds.dataset(
@@ -69,20 +89,30 @@ class Basic_s3_utils:
             format=input_fmt
         )
 
-        table = dataset.to_table()
+        # Lazy : one batch in memory at a time
+        if batch_size is not None:
+            return self._iter_batches(dataset, return_type, columns, filter_expr, batch_size)
+
+        table = dataset.to_table(columns=columns, filter=filter_expr)
 
         # Return dataset based on return type
         if return_type == 'pandas_df':
             return table.to_pandas()
-        
-        elif return_type == 'arrow_table':
-            return table
-        
-        else:
-            raise ValueError(
-                f"Unsupported return type: {return_type}. "
-                "Supported: pandas_df, arrow_table"
-            )
+
+        return table
+
+    def _iter_batches(self, dataset, return_type, columns, filter_expr, batch_size):
+        """
+            Yield the dataset batch by batch
+            param
+                dataset : pyarrow dataset
+                return_type : pandas_df | arrow_table (RecordBatch)
+                columns, filter_expr, batch_size : see read
+        """
+        for batch in dataset.to_batches(columns=columns, filter=filter_expr, batch_size=batch_size):
+            if batch.num_rows == 0:
+                continue
+            yield batch.to_pandas() if return_type == 'pandas_df' else batch
 
     def _read_json(self, path, return_type):
         obj = self.s3.get_object(Bucket=self.bucket, Key=path)
@@ -155,21 +185,21 @@ class Basic_s3_utils:
 
         key = f'{path}/{file_name}.{format}'
 
-        buffer = io.BytesIO()
-
+        # Serialized straight into the upload stream, no in-memory copy of the file
         if format == 'parquet':
-            df.to_parquet(buffer, index=False, engine="pyarrow", compression="snappy")
+            def write(sink):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                pq.write_table(table, sink, compression="snappy")
 
         elif format == 'csv':
-            csv_str = df.to_csv(index=False)
-            buffer = io.BytesIO(csv_str.encode('utf-8'))
+            write = csv_writer(df, index=False)
 
         else:
             logging.error(f'Unsupported pandas format: {format}')
             raise 
         
         # Load into S3
-        return self._put_object(buffer, key)
+        return self._put_stream(write, key)
 
     def _upload_json(self, data, path, file_name):
         """
@@ -187,28 +217,17 @@ class Basic_s3_utils:
         else:
             json_str = json.dumps(data, ensure_ascii=False)
 
-        buffer = io.BytesIO(json_str.encode('utf-8'))
-        
         # Load into S3
-        return self._put_object(buffer, key)
+        return self._put_stream(lambda sink: sink.write(json_str.encode('utf-8')), key)
 
     # Upload
-    def _put_object(self, buffer, key):
+    def _put_stream(self, write, key):
         """
-            Methods put data(buffer) in S3
+            Methods stream data into S3 with a managed multipart upload
             param
-                buffer : data buffered
+                write : callable(fileobj) writing the data
                 key : path to file
         """
 
         logging.info('Uploading data into s3 in progress')
-        logging.info(f'Uploading to S3 s3://{self.bucket}/{key}')
-        buffer.seek(0)
-
-        response = self.s3.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=buffer.getvalue()
-        )
-
-        return response
\ No newline at end of file
+        return upload_stream(self.s3, self.bucket, key, write)
\ No newline at end of file
@@ -0,0 +1,204 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+# Errors meaning the connection (or the server) is gone and worth a retry
+RETRYABLE_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class Database_pool:
+    """
+        Bounded connection pool for the app PostgresDB.
+        Connections are pre-pinged on checkout and dropped when broken,
+        so callers survive Postgres restarts without reconnect logic.
+        Shared by Database_utils in both route_kafka and Airflow utils.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, minconn = None, maxconn = None, retries = 3, retry_delay = 1.0):
+        """
+            Initialize the pool from APP_DB_* env variables
+            param
+                minconn : Connections opened up front (APP_DB_POOL_MIN, default 1)
+                maxconn : Upper bound of open connections (APP_DB_POOL_MAX, default 5)
+                retries : Attempts for a query when the connection drops
+                retry_delay : Base seconds between attempts (doubled each time)
+        """
+        self.minconn = int(minconn if minconn is not None else os.getenv('APP_DB_POOL_MIN', '1'))
+        self.maxconn = int(maxconn if maxconn is not None else os.getenv('APP_DB_POOL_MAX', '5'))
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self.conn_kwargs = {
+            'host' : os.getenv('APP_DB_HOST'),
+            'port' : os.getenv('APP_DB_PORT', '5432'),
+            'database' : os.getenv('APP_DB_NAME'),
+            'user' : os.getenv('APP_DB_USER'),
+            'password' : os.getenv('APP_DB_PSWD'),
+            'connect_timeout' : 10,
+            # Detect a dead peer instead of hanging on a half-open socket
+            'keepalives' : 1,
+            'keepalives_idle' : 30,
+            'keepalives_interval' : 10,
+            'keepalives_count' : 3,
+        }
+
+        self._pool = pool.ThreadedConnectionPool(
+            self.minconn, self.maxconn, **self.conn_kwargs
+        )
+        # getconn() raises when exhausted, block instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self.log = logging.getLogger("database-pool")
+
+    @classmethod
+    def shared(cls):
+        """
+            One pool per process
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    # Connections
+    def _ping(self, conn):
+        """
+            Pre-ping a pooled connection
+            param
+                conn : connection from the pool
+        """
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        """
+            Get a live connection, replacing dead ones
+        """
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._ping(conn):
+                return conn
+            self.log.warning("Dropping dead connection from pool")
+            self._pool.putconn(conn, close=True)
+
+        raise psycopg2.OperationalError("No live connection available in pool")
+
+    @contextmanager
+    def connection(self):
+        """
+            Borrow a connection for one transaction.
+            Commit on success, rollback on error, always give it back
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    def dedicated_connection(self, autocommit = True):
+        """
+            Open a connection outside the pool (e.g. for LISTEN).
+            The caller owns and closes it
+            param
+                autocommit : autocommit mode of the connection
+        """
+        conn = psycopg2.connect(**self.conn_kwargs)
+        conn.autocommit = autocommit
+        return conn
+
+    # Queries
+    def _with_retry(self, func):
+        """
+            Run func(conn) and retry on a dropped connection
+            param
+                func : callable receiving a connection
+        """
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.connection() as conn:
+                    return func(conn)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                self.log.warning(f"DB connection error ({e}), retry {attempt}/{self.retries} in {delay}s")
+                time.sleep(delay)
+
+    def execute(self, query, params = None):
+        """
+            Execute a statement without result
+            param
+                query : SQL statement
+                params : query parameters
+        """
+        def _run(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+
+        return self._with_retry(_run)
+
+    def fetch_all(self, query, params = None):
+        """
+            Execute a query and return every row
+            param
+                query : SQL statement
+                params : query parameters
+        """
+        def _run(conn):
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchall()
+
+        return self._with_retry(_run)
+
+    def fetch_batches(self, query, params = None, batch_size = 1000):
+        """
+            Stream rows in lists of batch_size through a server-side cursor.
+            Retried only while nothing has been yielded yet
+            param
+                query : SQL statement
+                params : query parameters
+                batch_size : rows per round trip
+        """
+        for attempt in range(1, self.retries + 1):
+            yielded = False
+            try:
+                with self.connection() as conn, conn.cursor(name=f"batch_{id(conn)}_{attempt}") as cur:
+                    cur.itersize = batch_size
+                    cur.execute(query, params)
+                    while True:
+                        rows = cur.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yielded = True
+                        yield rows
+                return
+            except RETRYABLE_ERRORS as e:
+                if yielded or attempt == self.retries:
+                    raise
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                self.log.warning(f"DB connection error ({e}), retry {attempt}/{self.retries} in {delay}s")
+                time.sleep(delay)
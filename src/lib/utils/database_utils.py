@@ -1,5 +1,5 @@
-import psycopg2
-import os
+from utils.database_pool import Database_pool
+
 
 class Database_utils:
     """
@@ -7,14 +7,7 @@ class Database_utils:
     """
 
     def __init__(self):
-        conn = psycopg2.connect(
-            host = os.getenv('APP_DB_HOST'),
-            database = os.getenv('APP_DB_NAME'),
-            user = os.getenv('APP_DB_USER'),
-            password = os.getenv('APP_DB_PSWD')
-        )
-
-        self.cur = conn.cursor()
+        self.db = Database_pool.shared()
 
 
 
@@ -22,10 +15,9 @@ class Database_utils:
         """
             Get all unique address of home and work
         """
-        self.cur.execute("""
+        rows = self.db.fetch_all("""
             select home_address, work_address from public.user_address
         """)
-        rows = self.cur.fetchall()
 
         merge = list({item for row in rows for item in row})
         return merge
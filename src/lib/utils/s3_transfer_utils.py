@@ -0,0 +1,148 @@
+import io
+import logging
+import os
+import threading
+
+from boto3.s3.transfer import TransferConfig
+
+MB = 1024 * 1024
+
+log = logging.getLogger("s3-transfer")
+
+
+def get_transfer_config():
+    """
+        Managed transfer settings from env
+            S3_MULTIPART_THRESHOLD_MB : size from which the upload is multipart (default 8)
+            S3_MULTIPART_CHUNK_MB : part size (default 8, S3 minimum is 5)
+            S3_MAX_CONCURRENCY : parts uploaded in parallel (default 4)
+    """
+    return TransferConfig(
+        multipart_threshold=int(float(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8")) * MB),
+        multipart_chunksize=int(float(os.getenv("S3_MULTIPART_CHUNK_MB", "8")) * MB),
+        max_concurrency=int(os.getenv("S3_MAX_CONCURRENCY", "4")),
+        use_threads=True,
+    )
+
+
+class _PipeWriter:
+    """
+        Write end of the pipe with the tell() pyarrow needs to place the parquet footer
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.raw.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        self.raw.flush()
+
+    def writable(self):
+        return True
+
+    def readable(self):
+        return False
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.raw.close()
+
+
+def csv_writer(df, **to_csv_kwargs):
+    """
+        Build the `write` callable of upload_stream for a pandas csv.
+        to_csv writes str, the pipe takes bytes : encode through a TextIOWrapper
+        param
+            df : pandas dataframe
+            to_csv_kwargs : arguments of DataFrame.to_csv
+    """
+    def write(sink):
+        text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+        df.to_csv(text, **to_csv_kwargs)
+        text.flush()
+        # Leave closing the pipe to upload_stream
+        text.detach()
+
+    return write
+
+
+class _PipeReader:
+    """
+        Read end of the pipe. EOF after a failed writer raises instead of ending the
+        stream, so the multipart upload is aborted rather than completed with a truncated object
+    """
+
+    def __init__(self, raw, state):
+        self.raw = raw
+        self.state = state
+
+    def read(self, size = -1):
+        data = self.raw.read(size)
+        if not data and self.state.get("error") is not None:
+            raise OSError(f"S3 upload source failed: {self.state['error']}") from self.state["error"]
+        return data
+
+    def close(self):
+        self.raw.close()
+
+
+def upload_stream(s3, bucket, key, write, config = None):
+    """
+        Upload what `write` produces with boto3's managed (multipart) transfer.
+        `write(fileobj)` runs in a thread into one end of an os.pipe while upload_fileobj
+        reads the other end, so at most max_concurrency parts are held in memory
+        param
+            s3 : boto3 S3 client
+            bucket : S3 bucket
+            key : path to file with file name
+            write : callable(fileobj) writing the payload as bytes
+            config : TransferConfig, default get_transfer_config()
+    """
+    log.info(f'Streaming upload to S3 s3://{bucket}/{key}')
+
+    read_fd, write_fd = os.pipe()
+    state = {"error": None}
+
+    def writer():
+        sink = _PipeWriter(os.fdopen(write_fd, "wb"))
+        try:
+            write(sink)
+        except BaseException as e:
+            # Set before the pipe is closed : the reader checks it on EOF
+            state["error"] = e
+            log.exception(f"Upload source of s3://{bucket}/{key} failed, aborting the upload")
+        finally:
+            try:
+                sink.close()
+            except OSError:
+                # Reader already gone (upload failed), nothing left to flush
+                pass
+
+    thread = threading.Thread(target=writer, name=f"s3-upload-writer-{key}", daemon=True)
+    thread.start()
+
+    source = _PipeReader(os.fdopen(read_fd, "rb"), state)
+    try:
+        s3.upload_fileobj(source, bucket, key, Config=config or get_transfer_config())
+    finally:
+        # Unblocks the writer with a broken pipe if the upload stopped early
+        source.close()
+        thread.join()
+
+    if state["error"] is not None:
+        raise state["error"]
+
+    return {"Bucket": bucket, "Key": key}
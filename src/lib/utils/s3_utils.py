@@ -4,6 +4,7 @@ import logging
 import io
 import pandas as pd
 
+from utils.s3_transfer_utils import upload_stream, csv_writer
 
 class S3_utils:
     """
@@ -43,34 +44,25 @@ class S3_utils:
         """
 
         try:
-            df_csv = df.to_csv(index=False)
-            buffer = io.BytesIO(df_csv.encode('utf-8'))
             key = 'stn-metadata/metadata.csv'
 
-            self._put_object(buffer, key)
+            self._put_stream(csv_writer(df, index=False), key)
         except Exception as e:
             raise Exception(f'Error has occured uploading stn metadata: {e}')
 
 
 
     # Upload
-    def _put_object(self, buffer, key):
+    def _put_stream(self, write, key):
         """
-            Methods put data(buffer) in S3
+            Methods stream data into S3 with a managed multipart upload
             param
-                buffer : data buffered
+                write : callable(fileobj) writing the data
                 key : path to file with file name
         """
 
         logging.info('Uploading data into s3 in progress')
-        logging.info(f'Uploading to S3 s3://{self.bucket}/{key}')
-        buffer.seek(0)
-
-        self.s3.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=buffer.getvalue()
-        )
+        upload_stream(self.s3, self.bucket, key, write)
 
     # Read Address-coord meta data
     def read_address(self):
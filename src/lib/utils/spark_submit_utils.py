@@ -0,0 +1,75 @@
+from airflow.providers.apache.spark.operators.spark_submit import SparkSubmitOperator
+
+# Same application and packages as the spark-weather-streaming service
+STREAMING_APP = "/opt/project/src/spark/jobs/weather_streaming.py"
+COMPACTION_APP = "/opt/project/src/spark/jobs/compact_s3.py"
+# Airflow pool sized to the spark-worker cores left by the always-on app (docker-compose)
+SPARK_BATCH_POOL = "spark_batch"
+SPARK_PACKAGES = (
+    "org.apache.spark:spark-sql-kafka-0-10_2.12:3.5.1,"
+    "org.apache.hadoop:hadoop-aws:3.3.4"
+)
+
+
+def spark_job_task(task_id, application, application_args, name):
+    """
+        spark-submit a job of src/spark/jobs on the cluster, capped at one executor core.
+        Runs in the spark_batch pool, so concurrent jobs queue in Airflow instead of
+        waiting for executors with their driver already up
+        param
+            task_id : Airflow task id
+            application : path of the job in the containers
+            application_args : job arguments (templated)
+            name : Spark application name
+    """
+    return SparkSubmitOperator(
+        task_id=task_id,
+        conn_id="spark_default",
+        application=application,
+        application_args=application_args,
+        packages=SPARK_PACKAGES,
+        executor_memory="900m",
+        executor_cores=1,
+        total_executor_cores=1,
+        name=name,
+        pool=SPARK_BATCH_POOL,
+        env_vars={
+            "PYTHONPATH": "/opt/project/src",
+            # Driver : this image's python / workers : the spark image's python (same 3.10 minor)
+            "PYSPARK_DRIVER_PYTHON": "python",
+            "PYSPARK_PYTHON": "/usr/bin/python3",
+        },
+    )
+
+
+def available_now_task(stream, task_id=None):
+    """
+        spark-submit one weather_streaming pipeline with Trigger.AvailableNow.
+        The job drains the topic from the pipeline's streaming checkpoint and exits,
+        so it must run after the producer task of the same DAG
+        param
+            stream : pipeline name (weather | forecast | air_realtime | air_forecast | air_summary)
+            task_id : Airflow task id, default run_<stream>_available_now
+    """
+    return spark_job_task(
+        task_id or f"run_{stream}_available_now",
+        STREAMING_APP,
+        ["--available-now", stream],
+        f"{stream}_available_now",
+    )
+
+
+def compaction_task(dataset, day, task_id=None):
+    """
+        spark-submit the parquet compaction of one table for one day
+        param
+            dataset : kma-weather | air-realtime
+            day : yyyymmdd (KST), may be a template
+            task_id : Airflow task id, default compact_<dataset>
+    """
+    return spark_job_task(
+        task_id or f"compact_{dataset.replace('-', '_')}",
+        COMPACTION_APP,
+        ["--dataset", dataset, "--date", day],
+        f"compact_{dataset}",
+    )
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import sys
@@ -5,7 +6,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from kafka import KafkaConsumer
-from route_kafka.utils.feedback import calculate_depart_at, adjust_route_for_display
+
+from route_kafka.utils.feedback import adjust_route_for_display, calculate_depart_at
 
 KST = ZoneInfo("Asia/Seoul")
 logger = logging.getLogger(__name__)
@@ -24,9 +26,11 @@ class RouteKafkaConsumer:
         route_service,
         topic: str = "route_request",
         group_id: str = "route-worker",
+        max_batch: int = 50,
     ):
         self.redis = redis_repo
         self.route_service = route_service
+        self.max_batch = max_batch
 
         self.consumer = KafkaConsumer(
             topic,
@@ -40,17 +44,51 @@ class RouteKafkaConsumer:
     def start(self):
         """
             Initiate consumer
-            Read message from topic
+            Read messages from topic in batches and handle each batch concurrently
+            on one event loop, so the pooled route client is reused
         """
         logger.info('[INIT] Route Kafka consumer started')
 
-        for msg in self.consumer:
-            try:
-                self.handle_message(msg.value)
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                records = self.consumer.poll(timeout_ms=1000, max_records=self.max_batch)
+                messages = [msg.value for batch in records.values() for msg in batch]
+                if not messages:
+                    continue
+
+                loop.run_until_complete(self.handle_batch(messages))
                 self.consumer.commit()
-            except Exception:
-                logger.exception('[ERROR] Failed to process message')
-                continue
+        finally:
+            loop.run_until_complete(self.route_service.google_api.close())
+            loop.close()
+
+
+    async def handle_batch(self, messages):
+        """
+            Handle messages concurrently, a failed message does not fail the batch.
+            A user sent twice in one batch (re-plan + profile change) is handled once with
+            the latest message : both would pass skipper before either route is cached
+            param
+                messages : topic messages
+        """
+        latest = {}
+        for message in messages:
+            latest[message.get("user_id")] = message
+        if len(latest) < len(messages):
+            logger.info(f"[DEDUP] {len(messages) - len(latest)} duplicate user messages in batch")
+        messages = list(latest.values())
+
+        results = await asyncio.gather(
+            *(self.handle_message(m) for m in messages),
+            return_exceptions=True,
+        )
+        for message, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"[ERROR] Failed to process message user_id={message.get('user_id')}",
+                    exc_info=result,
+                )
 
 
     def skipper(self, now, arrive_by, redis_cache):
@@ -74,7 +112,7 @@ class RouteKafkaConsumer:
         return remaining_sec < total_duration_sec
     
 
-    def handle_message(self, message):
+    async def handle_message(self, message):
         """
             Handle each topic meassage
             1. Check redis cache to see whether the route is already exists and still meaningful
@@ -93,7 +131,7 @@ class RouteKafkaConsumer:
         feedback_min = feedback_sec // 60
         now = datetime.now(KST)
 
-        redis_cache = self.redis.get(user_id)
+        redis_cache = self.redis.get_summary(user_id)
 
         if redis_cache and self.skipper(now, arrive_by, redis_cache):
             logger.debug(
@@ -103,7 +141,7 @@ class RouteKafkaConsumer:
             )
             return
         
-        route = self.route_service.fetch_route(message)
+        route = await self.route_service.fetch_route(message)
 
         depart_at = calculate_depart_at(
             arrive_by,
@@ -10,7 +10,7 @@ def main():
     redis_client = redis.Redis(
         host = os.getenv("REDIS_HOST"),
         port = int(os.getenv("REDIS_PORT")),
-        decode_responses=True,
+        decode_responses=False, # RedisRoute stores compressed bytes
     )
     redis_repo = RedisRoute(redis_client)
     google_api = GoogleAPIUtils()
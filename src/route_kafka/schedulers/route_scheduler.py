@@ -1,7 +1,8 @@
 import time
 from route_kafka.producers.route_request_producer import RouteRequestProducer
 from route_kafka.utils.database_utils import Database_utils
-from datetime import datetime
+from route_kafka.utils.commute_timeline import CommuteTimeline
+from datetime import datetime, timedelta
 import logging
 from zoneinfo import ZoneInfo
 
@@ -14,53 +15,116 @@ logger = logging.getLogger("route-scheduler")
 producer = RouteRequestProducer()
 db = Database_utils()
 
-TIME_INTERVAL = 300 # second
-LOOKAHEAD_MIN =  90 # minutes
+LOOKAHEAD_MIN =  90 # minutes, the check fires at arrive_by - LOOKAHEAD_MIN
+PLAN_HORIZON_MIN = 24 * 60 # minutes of arrivals planned ahead
+REPLAN_INTERVAL = 3600 # second, safety re-plan (day rollover, missed notifies)
+RETRY_INTERVAL = 10 # second
 
 KST = ZoneInfo("Asia/Seoul")
 
-while True:
-    now = datetime.now(KST).replace(tzinfo=None)
+timeline = CommuteTimeline(lookahead_min=LOOKAHEAD_MIN)
+next_plan_at = None
+listening = False
+index_checked = False
+
+
+def send_route_request(u):
+    request_id = producer.send_topic(
+        user_id=str(u["user_id"]),
+        request_info={
+            "home_address": (u["home_lon"], u["home_lat"]),
+            "work_address": (u["work_lon"], u["work_lat"]),
+            "arrival_time": u["arrive_by"],
+            "feedback_time": u["feedback_min"],
+        }
+    )
+
+    logger.info(
+        "[SEND] route_request",
+        extra={
+            "user_id": u["user_id"],
+            "request_id": request_id,
+            "arrive_by": u["arrive_by"].isoformat(),
+        }
+    )
 
-    logger.info("[IDLE] scheduler tick start")
+
+while True:
+    now = datetime.now(KST)
 
     try:
-        users = db.get_commute_candidates(
-            now=now,
-            lookahead_min=LOOKAHEAD_MIN
-        )
+        if not index_checked:
+            # Once per process, not on every reconnect
+            db.ensure_commute_index()
+            index_checked = True
 
-        if not users:
-            logger.info("[IDLE] no users in time window")
-        
-        logger.info(f'[DB] fetched {len(users)} users')
-
-        for u in users:
-            request_id = producer.send_topic(
-                user_id=str(u["user_id"]),
-                request_info={
-                    "home_address": (u["home_lon"], u["home_lat"]),
-                    "work_address": (u["work_lon"], u["work_lat"]),
-                    "arrival_time": u["arrive_by"],
-                    "feedback_time": u["feedback_min"],
-                }
-            )
+        if not listening and (next_plan_at is None or now >= next_plan_at):
+            # Without notifications the hourly re-plan still picks up profile changes
+            try:
+                if db.listen_profile_changes():
+                    logger.info("[INIT] listening on profile changes")
+                else:
+                    logger.warning(
+                        "[INIT] profile change triggers are not installed (fastapi schema setup), "
+                        f"changes are picked up by the re-plan every {REPLAN_INTERVAL}s"
+                    )
+                listening = True
+            except Exception:
+                logger.exception("[INIT] LISTEN failed, falling back to the periodic re-plan")
+                db.close_listener()
 
-            logger.info(
-                "[SEND] route_request",
-                extra={
-                    "user_id": u["user_id"],
-                    "request_id": request_id,
-                    "arrive_by": u["arrive_by"].isoformat(),
-                }
+        # Plan the departure-check timeline
+        if next_plan_at is None or now >= next_plan_at:
+            users = db.get_commute_candidates(
+                now=now,
+                lookahead_min=PLAN_HORIZON_MIN
             )
+            added = timeline.schedule_all(users)
+            next_plan_at = now + timedelta(seconds=REPLAN_INTERVAL)
+            logger.info(f'[PLAN] {added} newly scheduled, {len(timeline)} pending')
+
+        # Fire every check whose window is open
+        due = timeline.pop_due(now)
+        for i, u in enumerate(due):
+            try:
+                send_route_request(u)
+            except Exception:
+                # Unsent users go back on the timeline and fire after the reconnect
+                timeline.schedule_all(due[i:])
+                raise
+            timeline.mark_fired(u)
+
+        # Sleep until the next check, the next re-plan or a profile change
+        wait_sec = (next_plan_at - now).total_seconds()
+        next_sec = timeline.seconds_until_next(now)
+        if next_sec is not None:
+            wait_sec = min(wait_sec, next_sec)
 
         logger.info(
             "[SLEEP] scheduler sleeping",
-            extra={"interval_sec": TIME_INTERVAL}
+            extra={"wait_sec": wait_sec, "pending": len(timeline)}
         )
+        if listening:
+            changed = db.wait_profile_changes(timeout=max(wait_sec, 0))
+        else:
+            time.sleep(max(wait_sec, 0))
+            changed = set()
+
+        if changed:
+            for user_id in changed:
+                timeline.discard(user_id)
+
+            users = db.get_commute_candidates(
+                now=datetime.now(KST),
+                lookahead_min=PLAN_HORIZON_MIN,
+                user_ids=changed,
+            )
+            added = timeline.schedule_all(users)
+            logger.info(f'[UPDATE] {len(changed)} profiles changed, {added} rescheduled')
 
     except Exception:
         logger.exception("[ERROR] scheduler loop failed")
-
-    time.sleep(TIME_INTERVAL)
\ No newline at end of file
+        # Notifications may have been lost, reconnect and rebuild on the next loop
+        listening = False
+        next_plan_at = None
+        time.sleep(RETRY_INTERVAL)
@@ -0,0 +1,118 @@
+import heapq
+import itertools
+from datetime import timedelta
+
+
+def _route_key(user: dict):
+    '''
+        What a fired check was computed for, a change of address needs a new route
+    '''
+    return (user["home_lon"], user["home_lat"], user["work_lon"], user["work_lat"])
+
+
+class CommuteTimeline:
+    '''
+        Time-ordered queue of departure checks.
+        Each user is scheduled once per arrive_by, and fires when
+        (arrive_by - lookahead_min) is reached.
+    '''
+    def __init__(self, lookahead_min: int = 90):
+        self.lookahead = timedelta(minutes=lookahead_min)
+
+        self._heap = []                 # (fire_at, seq, user_id, arrive_by)
+        self._seq = itertools.count()   # tie breaker, users are not comparable
+        self._scheduled = {}            # user_id -> (arrive_by, user)
+        self._fired = {}                # user_id -> (arrive_by, route key) already sent
+
+    def __len__(self):
+        return len(self._scheduled)
+
+    def schedule(self, user: dict):
+        '''
+            Put a user's departure check on the timeline.
+            Same user with the same arrive_by is ignored, so a full
+            re-plan only adds what is new. An already sent check is only
+            scheduled again if the user's addresses changed.
+            param
+                user : row from Database_utils.get_commute_candidates
+        '''
+        user_id = user["user_id"]
+        arrive_by = user["arrive_by"]
+
+        scheduled = self._scheduled.get(user_id)
+        if scheduled and scheduled[0] == arrive_by:
+            return False
+        if self._fired.get(user_id) == (arrive_by, _route_key(user)):
+            return False
+
+        # Old heap entry (if any) becomes stale and is skipped on pop
+        self._scheduled[user_id] = (arrive_by, user)
+        heapq.heappush(
+            self._heap,
+            (arrive_by - self.lookahead, next(self._seq), user_id, arrive_by)
+        )
+        return True
+
+    def schedule_all(self, users):
+        '''
+            Schedule every user and return how many were newly added
+            param
+                users : iterable of candidate rows
+        '''
+        return sum(1 for u in users if self.schedule(u))
+
+    def discard(self, user_id):
+        '''
+            Drop a user's pending check, e.g. when the profile changed.
+            The sent check is remembered, so an unrelated profile edit does not send it twice
+            param
+                user_id : User's unique ID
+        '''
+        self._scheduled.pop(user_id, None)
+
+    def mark_fired(self, user: dict):
+        '''
+            Record a popped check as sent
+            param
+                user : row returned by pop_due
+        '''
+        self._fired[user["user_id"]] = (user["arrive_by"], _route_key(user))
+
+    def pop_due(self, now):
+        '''
+            Pop every user whose window is open at `now`.
+            Call mark_fired once a user is sent, schedule it again if the send failed
+            param
+                now : Current time (tz-aware)
+        '''
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, user_id, arrive_by = heapq.heappop(self._heap)
+
+            scheduled = self._scheduled.get(user_id)
+            if not scheduled or scheduled[0] != arrive_by:
+                continue  # stale entry
+
+            del self._scheduled[user_id]
+            due.append(scheduled[1])
+
+        # Forget fired checks whose arrival has passed
+        self._fired = {
+            uid: fired for uid, fired in self._fired.items()
+            if fired[0] > now
+        }
+        return due
+
+    def seconds_until_next(self, now):
+        '''
+            Seconds until the next pending check, None if nothing is pending
+            param
+                now : Current time (tz-aware)
+        '''
+        while self._heap:
+            fire_at, _, user_id, arrive_by = self._heap[0]
+            scheduled = self._scheduled.get(user_id)
+            if scheduled and scheduled[0] == arrive_by:
+                return max((fire_at - now).total_seconds(), 0.0)
+            heapq.heappop(self._heap)  # stale entry
+        return None
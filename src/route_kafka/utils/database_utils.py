@@ -1,6 +1,14 @@
-import psycopg2
-import os
+import logging
+import select
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import psycopg2
+
+from lib.utils.database_pool import Database_pool
+
+PROFILE_CHANNEL = "user_profile_changed"
+KST = ZoneInfo("Asia/Seoul")
 
 class Database_utils:
     """
@@ -8,72 +16,191 @@ class Database_utils:
     """
 
     def __init__(self):
-        self.conn = psycopg2.connect(
-            host = os.getenv('APP_DB_HOST'),
-            database = os.getenv('APP_DB_NAME'),
-            user = os.getenv('APP_DB_USER'),
-            password = os.getenv('APP_DB_PSWD')
-        )
-        self.conn.autocommit = True
+        self.db = Database_pool.shared()
+
+        # LISTEN needs its own long-lived connection, see listen_profile_changes
+        self.listen_conn = None
 
 
 
+    def ensure_commute_index(self):
+        """
+            Create the index backing get_commute_candidates if missing
+            (declared in fastapi/models.py, but create_all skips existing tables).
+            Partial on commute_time and covering feedback_min so the range
+            scan never touches rows without a commute time.
+
+            Only a catalog lookup when the index exists. Otherwise it is built
+            CONCURRENTLY on an autocommit connection, so profile writes are not
+            blocked during the build. Missing DDL rights only log a warning
+        """
+        log = logging.getLogger("route-scheduler")
+        rows = self.db.fetch_all("""
+            SELECT ix.indisvalid
+            FROM pg_class c
+            JOIN pg_index ix ON ix.indexrelid = c.oid
+            WHERE c.relname = 'ix_user_profile_commute_time'
+        """)
+        if rows:
+            if not rows[0][0]:
+                # Left over by an interrupted concurrent build, the planner ignores it
+                log.warning("ix_user_profile_commute_time is INVALID, rebuild it with REINDEX INDEX CONCURRENTLY")
+            return
+
+        conn = self.db.dedicated_connection(autocommit=True)
+        try:
+            with conn.cursor() as cur:
+                # CONCURRENTLY cannot run inside a transaction block
+                cur.execute("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_profile_commute_time
+                        ON user_profile (commute_time)
+                        INCLUDE (feedback_min)
+                        WHERE commute_time IS NOT NULL
+                """)
+            log.info("Created ix_user_profile_commute_time")
+        except psycopg2.Error as e:
+            log.warning(f"Could not create ix_user_profile_commute_time, falling back to a scan: {e}")
+        finally:
+            conn.close()
+
+
     def get_commute_candidates(
         self,
         now: datetime,
         lookahead_min: int = 90,
+        user_ids: list | None = None,
+        batch_size: int = 2000,
     ):
         """
-            Fetch users whose arrival deadline (commute_time - 10minute)
+            Yield users whose arrival deadline (commute_time - 10minute)
             is within [now + 35min(for alert), now + lookahead_min]
-            Default lookahead minute is 90 which means 60minutes for all cases of 
+            Default lookahead minute is 90 which means 60minutes for all cases of
             commuting time plus 30 minutes for extra time of alert time
+
+            The window is turned into a range on commute_time itself so the
+            partial index is used, split in two when it crosses midnight.
+            arrive_by is resolved to the right day in python.
+            param
+                now : Current time (tz-aware)
+                lookahead_min : End of the window in minutes from now
+                user_ids : Restrict the fetch to these users (optional)
+                batch_size : Rows per round trip of the server-side cursor
         """
-        startpoint = now + timedelta(minutes=35)
-        endpoint = now + timedelta(minutes=lookahead_min)
+        # commute_time = arrive_by + 10 minutes
+        offset = timedelta(minutes=10)
+        startpoint = (now + timedelta(minutes=35) + offset).astimezone(KST)
+        endpoint = (now + timedelta(minutes=lookahead_min) + offset).astimezone(KST)
 
-        query = """
+        if endpoint - startpoint >= timedelta(days=1):
+            time_filter = ""
+        elif startpoint.date() == endpoint.date():
+            time_filter = "AND up.commute_time BETWEEN %(start_time)s AND %(end_time)s"
+        else:
+            time_filter = (
+                "AND (up.commute_time >= %(start_time)s"
+                " OR up.commute_time <= %(end_time)s)"
+            )
+        user_filter = "AND up.id = ANY(%(user_ids)s)" if user_ids else ""
+
+        query = f"""
             SELECT
-                u.id as user_id
+                up.id as user_id
                 , ua.home_lat
                 , ua.home_lon
                 , ua.work_lat
                 , ua.work_lon
-                , (date_trunc('day', now()) + up.commute_time - INTERVAL '10 minutes') 
-                    as arrive_by
+                , up.commute_time
                 , COALESCE(up.feedback_min, 0) as feedback_min
-            FROM users u
-            JOIN user_profile up
-                ON u.id = up.id
+            FROM user_profile up
             JOIN user_address ua
-                ON u.id = ua.id
+                ON up.id = ua.id
             WHERE
                 up.commute_time IS NOT NULL
-                AND (date_trunc('day', now()) + up.commute_time - INTERVAL '10 minutes') 
-                    BETWEEN %(startpoint)s AND %(endpoint)s
-            ORDER BY arrive_by ASC
+                {time_filter}
+                {user_filter}
         """
 
-        with self.conn.cursor() as cur:
-            cur.execute(
-                query,
-                {
-                    "startpoint" : startpoint,
-                    "endpoint" : endpoint
-                }
-            )
-            rows = cur.fetchall()
-        
-        return [
+        # Server-side cursor : rows are streamed in batches instead of fetchall
+        batches = self.db.fetch_batches(
+            query,
             {
-                "user_id": r[0],
-                "home_lat": float(r[1]),
-                "home_lon": float(r[2]),
-                "work_lat": float(r[3]),
-                "work_lon": float(r[4]),
-                "arrive_by": r[5],
-                "feedback_min": r[6],
-            }
-            for r in rows
-        ]
-        
\ No newline at end of file
+                "start_time" : startpoint.time().replace(tzinfo=None),
+                "end_time" : endpoint.time().replace(tzinfo=None),
+                "user_ids" : list(user_ids or []),
+            },
+            batch_size=batch_size,
+        )
+
+        for rows in batches:
+            for r in rows:
+                commute_at = datetime.combine(startpoint.date(), r[5], tzinfo=KST)
+                if commute_at < startpoint:
+                    commute_at += timedelta(days=1)
+
+                yield {
+                    "user_id": r[0],
+                    "home_lat": float(r[1]),
+                    "home_lon": float(r[2]),
+                    "work_lat": float(r[3]),
+                    "work_lon": float(r[4]),
+                    "arrive_by": commute_at - offset,
+                    "feedback_min": r[6],
+                }
+
+
+    def listen_profile_changes(self):
+        """
+            LISTEN on the channel fed by the NOTIFY triggers of user_profile / user_address,
+            so the scheduler hears about changed users instead of polling the whole table.
+            The triggers are installed with the schema (fastapi/models.py install_profile_notify),
+            this needs no DDL rights.
+            Return False when the triggers are missing : nothing will be notified and
+            changes are only picked up by the periodic re-plan.
+            Calling it again replaces a broken listener connection
+        """
+        self.close_listener()
+        self.listen_conn = self.db.dedicated_connection()
+
+        with self.listen_conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM pg_trigger
+                WHERE tgname IN ('trg_user_profile_changed', 'trg_user_address_changed')
+            """)
+            installed = cur.fetchone()[0] == 2
+            cur.execute(f"LISTEN {PROFILE_CHANNEL}")
+        return installed
+
+
+    def wait_profile_changes(self, timeout: float | None = None):
+        """
+            Block until a profile change is notified or timeout passes.
+            Return the set of changed user ids (empty on timeout)
+            param
+                timeout : Max seconds to wait, None waits forever
+        """
+        conn = self.listen_conn
+        if conn is None or conn.closed:
+            raise RuntimeError("Not listening, call listen_profile_changes first")
+
+        if not conn.notifies:
+            ready, _, _ = select.select([conn], [], [], timeout)
+            if ready:
+                conn.poll()
+
+        user_ids = set()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                user_ids.add(int(notify.payload))
+            except ValueError:
+                continue
+        return user_ids
+
+
+    def close_listener(self):
+        """
+            Close the LISTEN connection if open
+        """
+        if self.listen_conn is not None and not self.listen_conn.closed:
+            self.listen_conn.close()
+        self.listen_conn = None
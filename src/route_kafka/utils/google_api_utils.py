@@ -1,39 +1,155 @@
-import os
-import requests
+import asyncio
 import logging
+import os
+import random
+import time
+
+import httpx
+
+log = logging.getLogger("routes-api")
+
+# Rate limiters are shared by every client using the same API key
+RATE_LIMITERS = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+        Raised without calling the API while the circuit breaker is open
+    """
+
+
+class RateLimiter:
+    """
+        Async token bucket, `qps` requests per second with bursts up to `burst`
+    """
+    def __init__(self, qps: float, burst: int | None = None):
+        self.rate = float(qps)
+        self.capacity = float(burst or max(1, int(qps)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+        Open after `failure_threshold` consecutive failures, reject calls for
+        `reset_timeout` seconds, then let a single trial call through (half-open)
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def before_call(self):
+        if self.opened_at is None:
+            return
+        if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+            raise CircuitOpenError("Routes API circuit is open")
+        self.trial_running = True  # half-open
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
 
 
 class GoogleAPIUtils:
     """
-        Util clasas for requesting google api 
+        Util clasas for requesting google api
+        Single pooled async client (keep-alive + HTTP/2), jittered exponential
+        retries, per-key rate limit and a circuit breaker
     """
     BASE_URL = "https://routes.googleapis.com/directions/v2:computeRoutes"
+    DEFAULT_FIELD_MASK = "routes.duration,routes.distanceMeters,routes.legs.steps"
+    RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
 
-    def __init__(self):
+    def __init__(self, max_retries: int = 4, backoff_base: float = 0.5, backoff_cap: float = 8.0):
+        """
+            param
+                max_retries : Retries after the first attempt on 429/5xx/network errors
+                backoff_base : First backoff in seconds, doubled per retry
+                backoff_cap : Upper bound of a single backoff
+        """
         self.api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        # Routes API default quota is 3,000 QPM per project
+        qps = float(os.getenv("GOOGLE_ROUTES_QPS", "50"))
+        if self.api_key not in RATE_LIMITERS:
+            RATE_LIMITERS[self.api_key] = RateLimiter(qps)
+        self.rate_limiter = RATE_LIMITERS[self.api_key]
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("GOOGLE_ROUTES_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("GOOGLE_ROUTES_BREAKER_RESET_SEC", "30")),
+        )
+
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=20,
+                max_keepalive_connections=10,
+                keepalive_expiry=60,
+            ),
+        )
+
+    def _backoff(self, attempt, response=None):
+        """
+            Full-jitter exponential backoff, honoring Retry-After when given
+            param
+                attempt : retry number starting at 0
+                response : failed response, if any
+        """
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
 
-    def request_route_api(self, lon1, lat1, lon2, lat2, arrival_time):
+    async def request_route_api(self, lon1, lat1, lon2, lat2, arrival_time, field_mask=None):
         """
             Request Google API (route) as json
-            param 
+            param
                 lon1 : longitude of home address
                 lat1 : latitude of home address
                 lon2 : longitude of work address
                 lat2 : latitude of work address
-                arrival_time : estimated arrival time : 
+                arrival_time : estimated arrival time :
+                field_mask : X-Goog-FieldMask, only these fields are returned
         """
 
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "routes.duration,routes.distanceMeters,routes.legs.steps"
+            "X-Goog-FieldMask": field_mask or self.DEFAULT_FIELD_MASK,
         }
-        
+
         data = {
             "origin": {
                 "location": {
                     "latLng": {
-                        "latitude": lat1,  
+                        "latitude": lat1,
                         "longitude": lon1
                     }
                 }
@@ -41,7 +157,7 @@ class GoogleAPIUtils:
             "destination": {
                 "location": {
                     "latLng": {
-                        "latitude": lat2,    
+                        "latitude": lat2,
                         "longitude": lon2
                     }
                 }
@@ -50,17 +166,51 @@ class GoogleAPIUtils:
             "arrivalTime": arrival_time,
         }
 
+        self.breaker.before_call()
+        settled = False
         try:
-            response = requests.post(self.BASE_URL, headers=headers, json=data, timeout=10)
-            if response.status_code != 200:
-                logging.error(
-                    "Routes API error: status=%s body=%s",
-                    response.status_code,
-                    response.text,
-                )
-            response.raise_for_status()
-            return response.json()
-        
-        except Exception as e:
-            logging.exception(f"Unexpected error caught while requesting Route API : {e}")
-            raise
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                response = None
+                try:
+                    response = await self.client.post(self.BASE_URL, headers=headers, json=data)
+                    if response.status_code == 200:
+                        body = response.json()
+                        self.breaker.record_success()
+                        settled = True
+                        return body
+
+                    log.error(
+                        "Routes API error: status=%s body=%s",
+                        response.status_code,
+                        response.text,
+                    )
+                    if response.status_code not in self.RETRY_STATUS:
+                        # Bad request / auth : retrying will not help, and it is not an outage
+                        self.breaker.record_success()
+                        settled = True
+                        response.raise_for_status()
+
+                except httpx.TransportError as e:
+                    log.warning(f"Routes API transport error : {e}")
+
+                if attempt == self.max_retries:
+                    break
+
+                delay = self._backoff(attempt, response)
+                log.info(f"Retrying Routes API in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+            raise RuntimeError(f"Routes API failed after {self.max_retries + 1} attempts")
+
+        finally:
+            # Any other exit (retries exhausted, decoding error, cancellation...) is a failure,
+            # so a half-open trial never leaves the breaker stuck open
+            if not settled:
+                self.breaker.record_failure()
+
+    async def close(self):
+        """
+            Close pooled connections
+        """
+        await self.client.aclose()
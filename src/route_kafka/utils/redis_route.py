@@ -1,11 +1,49 @@
 import json
+import zlib
+
+from redis.exceptions import ResponseError
+
+# Small fields readable with one HMGET, without touching the route blob
+SUMMARY_FIELDS = (
+    "user_id", "depart_at", "arrive_by",
+    "total_duration_sec", "feedback_min", "generated_at",
+)
+INT_FIELDS = ("user_id", "total_duration_sec", "feedback_min")
+
+
+def pack(obj):
+    '''
+        Compact JSON compressed with zlib
+        param
+            obj : json serializable object
+    '''
+    return zlib.compress(
+        json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    )
+
+
+def unpack(data):
+    '''
+        Reverse of pack
+        param
+            data : bytes from redis
+    '''
+    return json.loads(zlib.decompress(data))
+
 
 class RedisRoute:
     '''
         Util class for put and get data into/from redis
+
+        route:state:{user_id}    HASH : summary fields + `route` (zlib JSON, no polylines)
+        route:polyline:{user_id} STRING : zlib JSON list of step polylines
+        The redis client must be created with decode_responses=False
     '''
-    def __init__(self, redis_client):
+    TTL = 60 * 60 # 1 hour
+
+    def __init__(self, redis_client, split_polylines: bool = True):
         self.redis = redis_client
+        self.split_polylines = split_polylines
 
     def _key(self, user_id:str):
         '''
@@ -14,16 +52,71 @@ class RedisRoute:
                 user_id : User's unique ID
         '''
         return f'route:state:{user_id}'
-    
-    def get(self, user_id:str):
+
+    def _polyline_key(self, user_id:str):
+        '''
+            create polyline key by user id
+            param
+                user_id : User's unique ID
+        '''
+        return f'route:polyline:{user_id}'
+
+    def get_summary(self, user_id:str):
+        '''
+            Get only depart_at / total_duration_sec / ... if exists
+            param
+                user_id : User's unique ID
+        '''
+        try:
+            values = self.redis.hmget(self._key(user_id), SUMMARY_FIELDS)
+        except ResponseError:
+            # Legacy JSON string written before the hash layout
+            legacy = self._get_legacy(user_id)
+            return {k: legacy.get(k) for k in SUMMARY_FIELDS} if legacy else None
+
+        if all(v is None for v in values):
+            return None
+        return self._decode_summary(values)
+
+    def _decode_summary(self, values):
+        summary = {
+            k: v.decode("utf-8") if v is not None else None
+            for k, v in zip(SUMMARY_FIELDS, values)
+        }
+        for k in INT_FIELDS:
+            if summary[k] is not None:
+                summary[k] = int(summary[k])
+        return summary
+
+    def get(self, user_id:str, include_polylines: bool = True):
         '''
             Get data if exists from key composed of userID
             param
                 user_id : User's unique ID
+                include_polylines : merge the step polylines back into the route
         '''
+        try:
+            data = self.redis.hgetall(self._key(user_id))
+        except ResponseError:
+            return self._get_legacy(user_id)
+
+        if not data:
+            return None
+
+        payload = self._decode_summary([data.get(k.encode()) for k in SUMMARY_FIELDS])
+        payload["route"] = unpack(data[b"route"]) if data.get(b"route") else None
+
+        if include_polylines and payload["route"]:
+            raw = self.redis.get(self._polyline_key(user_id))
+            polylines = unpack(raw) if raw else []
+            for segment, polyline in zip(payload["route"].get("segments", []), polylines):
+                segment["polyline"] = polyline
+        return payload
+
+    def _get_legacy(self, user_id:str):
         data = self.redis.get(self._key(user_id))
         return json.loads(data) if data else None
-    
+
 
     def set(self, user_id:str, payload:dict):
         """
@@ -32,8 +125,33 @@ class RedisRoute:
                 user_id : User's unique ID
                 payload : the data as json of route data
         """
-        self.redis.set(
-            self._key(user_id),
-            json.dumps(payload),
-            ex = 60 * 60 # TTL : 1 hour
-        )
\ No newline at end of file
+        key = self._key(user_id)
+        route = payload.get("route")
+
+        polylines = None
+        if route and self.split_polylines:
+            segments = route.get("segments", [])
+            polylines = [s.get("polyline") for s in segments]
+            route = {
+                **route,
+                "segments": [
+                    {k: v for k, v in s.items() if k != "polyline"}
+                    for s in segments
+                ],
+            }
+
+        mapping = {
+            k: str(payload[k]) for k in SUMMARY_FIELDS if payload.get(k) is not None
+        }
+        if route is not None:
+            mapping["route"] = pack(route)
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key) # also clears a legacy JSON string value
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.TTL)
+        if polylines is not None:
+            pipe.set(self._polyline_key(user_id), pack(polylines), ex=self.TTL)
+        else:
+            pipe.delete(self._polyline_key(user_id))
+        pipe.execute()
@@ -2,6 +2,36 @@ from zoneinfo import ZoneInfo
 
 KST = ZoneInfo("Asia/Seoul")
 
+# Exactly the fields read by RouteService._normalize, keep both in sync
+_STEP = "routes.legs.steps"
+_TRANSIT = f"{_STEP}.transitDetails"
+ROUTE_FIELD_MASK = ",".join([
+    "routes.duration",
+    "routes.distanceMeters",
+    f"{_STEP}.travelMode",
+    f"{_STEP}.staticDuration",
+    f"{_STEP}.distanceMeters",
+    f"{_STEP}.polyline.encodedPolyline",
+    f"{_STEP}.startLocation.latLng",
+    f"{_STEP}.endLocation.latLng",
+    f"{_STEP}.navigationInstruction.instructions",
+    f"{_STEP}.localizedValues",
+    f"{_TRANSIT}.transitLine.nameShort",
+    f"{_TRANSIT}.transitLine.color",
+    f"{_TRANSIT}.transitLine.textColor",
+    f"{_TRANSIT}.transitLine.vehicle.type",
+    f"{_TRANSIT}.transitLine.vehicle.iconUri",
+    f"{_TRANSIT}.headsign",
+    f"{_TRANSIT}.headway",
+    f"{_TRANSIT}.stopCount",
+    f"{_TRANSIT}.stopDetails.departureStop.name",
+    f"{_TRANSIT}.stopDetails.departureStop.location.latLng",
+    f"{_TRANSIT}.stopDetails.arrivalStop.name",
+    f"{_TRANSIT}.stopDetails.arrivalStop.location.latLng",
+    f"{_TRANSIT}.stopDetails.departureTime",
+    f"{_TRANSIT}.stopDetails.arrivalTime",
+])
+
 class RouteService:
     '''
         Request API from Google Route and normalize its response
@@ -9,7 +39,7 @@ class RouteService:
     def __init__(self, google_api):
         self.google_api = google_api
 
-    def fetch_route(self, message):
+    async def fetch_route(self, message):
         '''
             based on the message in topic, request route api to 
             get its route information and normalize
@@ -20,12 +50,13 @@ class RouteService:
         origin = message["origin"]
         destination = message["destination"]
 
-        raw = self.google_api.request_route_api(
+        raw = await self.google_api.request_route_api(
             lon1=origin["lon"],
             lat1=origin["lat"],
             lon2=destination["lon"],
             lat2=destination["lat"],
             arrival_time=message["arrive_by"],
+            field_mask=ROUTE_FIELD_MASK,
         )
         return self._normalize(raw)
 
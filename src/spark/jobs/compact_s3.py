@@ -0,0 +1,43 @@
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from spark.utils.s3_compaction import COMPACTION_DATASETS, KST, ParquetCompactor
+from spark.utils.spark_utils import Spark_utils
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger("s3-compaction")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compact the hourly parquet partitions of one day")
+    parser.add_argument(
+        "--dataset",
+        nargs="+",
+        choices=COMPACTION_DATASETS,
+        default=list(COMPACTION_DATASETS),
+        help="Tables to compact, default all",
+    )
+    parser.add_argument(
+        "--date",
+        help="Day to compact (yyyymmdd, KST), default yesterday",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    day = args.date or (datetime.now(KST) - timedelta(days=1)).strftime("%Y%m%d")
+
+    spark_utils = Spark_utils()
+    spark = spark_utils.get_spark(f"s3_compaction_{day}")
+    try:
+        for dataset in args.dataset:
+            log.info(f"Compacting {dataset} partitions of {day}...")
+            ParquetCompactor(spark, spark_utils.bucket, dataset).compact_day(day)
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
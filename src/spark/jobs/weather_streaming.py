@@ -1,25 +1,36 @@
 from spark.utils.spark_utils import Spark_utils
 from spark.utils.book_recommender import BookRecommender
+from spark.utils.air_forecast_cache import AirForecastCache
+from spark.utils.station_metadata import StationMetadata
+from spark.utils.streaming_metrics import REGISTRY, push_metrics, record_progress, start_metrics_exporter
+from spark.utils.stream_config import StreamConfig, AVAILABLE_NOW
 from pyspark.sql.functions import broadcast
 from pyspark.sql.functions import (
-    col, when, lit, coalesce, row_number, to_date
+    col, when, lit, coalesce, to_date
 )
-from pyspark.sql.window import Window
 
+import os
+import json
+import argparse
 import logging
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("weather-forecast-streaming")
 
-def run_weather_stream(spark_utils, spark, music_df):
+# Every pipeline started by run_streams, in start order
+STREAMS = ("weather", "forecast", "air_realtime", "air_forecast", "air_summary")
+
+def run_weather_stream(spark_utils, spark, music_df, trigger=None):
     """
         The topic is received data every Hourly(00:05) 
     """
 
     log.info("Initializing weather stream...")
 
+    conf = StreamConfig.load("weather", trigger)
+
     # Read Kafka
-    raw_weather = spark_utils.read_kafka_topic(spark, 'hourly_weather_raw')
+    raw_weather = spark_utils.read_kafka_topic(spark, 'hourly_weather_raw', **conf.kafka_options())
 
     # Preprocess
     df_weather = spark_utils.preprocessing_kma_weather(raw_weather)
@@ -34,77 +45,81 @@ def run_weather_stream(spark_utils, spark, music_df):
         spark=spark,
         bucket=spark_utils.bucket
     )
-    df_with_recommendation = br.add_recommendation(df_weather)
-    df_meta = spark.read.csv(f"s3a://{spark_utils.bucket}/stn-metadata/metadata.csv", header=True, inferSchema=True)
-    df_with_recommendation_stn_meta = df_with_recommendation.join(df_meta, on="stn_id")
-
-    # Redis Sink
-    redis_checkpoint = f"s3a://{spark_utils.bucket}/kma-weather/_checkpoint_redis"
-    redis_query = (
-        df_with_recommendation_stn_meta
-        .repartition(1)
-        .writeStream
-        .foreachBatch(spark_utils.save_batch_to_redis)
-        .outputMode("append")
-        .option("checkpointLocation", redis_checkpoint)
-        .start()
+    stn_metadata = StationMetadata(
+        spark,
+        f"s3a://{spark_utils.bucket}/stn-metadata/metadata.csv"
     )
 
-    # S3 Sink
-    s3_checkpoint = f"s3a://{spark_utils.bucket}/kma-weather/_checkpoint_s3"
-    s3_query = (
-        df_with_recommendation_stn_meta.writeStream
-        .foreachBatch(spark_utils.save_batch_to_s3)
+    # Redis + S3 Sink, one query so Kafka and the joins are read once per trigger
+    sinks = spark_utils.fan_out(
+        spark_utils.save_batch_to_redis,
+        spark_utils.save_batch_to_s3,
+    )
+
+    def write_weather_batch(batch_df, batch_id):
+        # Recommendation runs per batch so refreshed book tiers are picked up
+        df_with_recommendation = br.add_recommendation(batch_df)
+        df_with_recommendation_stn_meta = df_with_recommendation.join(
+            broadcast(stn_metadata.get()),
+            on="stn_id"
+        )
+        sinks(df_with_recommendation_stn_meta, batch_id)
+
+    checkpoint = f"s3a://{spark_utils.bucket}/kma-weather/_checkpoint"
+    query = (
+        conf.apply(df_weather.writeStream)
+        .foreachBatch(conf.pooled(write_weather_batch))
         .outputMode("append")
-        .option("checkpointLocation", s3_checkpoint)
+        .option("checkpointLocation", checkpoint)
         .start()
     )
 
     log.info("Weather streaming started.")
-    return [redis_query, s3_query]
+    return [query]
 
 
-def run_forecast_stream(spark_utils, spark):
+def run_forecast_stream(spark_utils, spark, trigger=None):
     """
         30 minutes interval for 6hours of weather forecast
     """
 
     log.info("Initializing forecast stream...")
 
+    conf = StreamConfig.load("forecast", trigger)
+
     # Read Kafka
-    raw_forecast = spark_utils.read_kafka_topic(spark, '30min_forecast_raw')
+    raw_forecast = spark_utils.read_kafka_topic(spark, '30min_forecast_raw', **conf.kafka_options())
 
     # Preprocess
     df_forecast = spark_utils.preprocessing_weather_forecast(raw_forecast)
 
-    # Redis Sink
-    redis_checkpoint = f"s3a://{spark_utils.bucket}/weather-forecast/_checkpoint_redis"
-    redis_query = (
-        df_forecast.writeStream
-        .foreachBatch(spark_utils.save_batch_to_redis_forecast)
+    # Redis + S3 Sink, update mode : only the (address, base time) rows changed in this trigger
+    checkpoint = f"s3a://{spark_utils.bucket}/weather-forecast/_checkpoint"
+    query = (
+        conf.apply(df_forecast.writeStream)
+        .foreachBatch(
+            conf.pooled(
+                spark_utils.fan_out(
+                    spark_utils.save_batch_to_redis_forecast,
+                    spark_utils.save_batch_to_s3_forecast,
+                )
+            )
+        )
         .outputMode("update")
-        .option("checkpointLocation", redis_checkpoint)
-        .start()
-    )
-
-    # S3 Sink
-    s3_checkpoint = f"s3a://{spark_utils.bucket}/weather-forecast/_checkpoint_s3"
-    s3_query = (
-        df_forecast.writeStream
-        .foreachBatch(spark_utils.save_batch_to_s3_forecast)
-        .outputMode("complete")
-        .option("checkpointLocation", s3_checkpoint)
+        .option("checkpointLocation", checkpoint)
         .start()
     )
 
     log.info("Forecast streaming started.")
-    return [redis_query, s3_query]
+    return [query]
 
-def run_air_realtime_stream(spark_utils, spark):
+def run_air_realtime_stream(spark_utils, spark, trigger=None):
 
     log.info("Initializing air-realtime stream...")
 
-    air_realtime_raw = spark_utils.read_kafka_topic(spark, "air-quality-realtime")
+    conf = StreamConfig.load("air_realtime", trigger)
+
+    air_realtime_raw = spark_utils.read_kafka_topic(spark, "air-quality-realtime", **conf.kafka_options())
     air_realtime_df = spark_utils.preprocessing_air_realtime(air_realtime_raw)
     '''
     air_redis_checkpoint = f"s3a://{spark_utils.bucket}/air-realtime/_checkpoint_redis"
@@ -120,9 +135,8 @@ def run_air_realtime_stream(spark_utils, spark):
     '''
     air_s3_checkpoint = f"s3a://{spark_utils.bucket}/air-realtime/_checkpoint_s3"
     air_s3_query = (
-        air_realtime_df
-        .writeStream
-        .foreachBatch(spark_utils.save_batch_to_s3_air_realtime)
+        conf.apply(air_realtime_df.writeStream)
+        .foreachBatch(conf.pooled(spark_utils.save_batch_to_s3_air_realtime))
         .outputMode("append")
         .option("checkpointLocation", air_s3_checkpoint)
         .start()
@@ -131,17 +145,18 @@ def run_air_realtime_stream(spark_utils, spark):
     log.info("Air-realtime streaming started.")
     return [air_s3_query]
 
-def run_air_forecast_stream(spark_utils, spark):
+def run_air_forecast_stream(spark_utils, spark, trigger=None):
     log.info("Initializing air-forecast stream...")
-    air_forecast_raw = spark_utils.read_kafka_topic(spark, "air-quality-forecast")
+    conf = StreamConfig.load("air_forecast", trigger)
+    air_forecast_raw = spark_utils.read_kafka_topic(spark, "air-quality-forecast", **conf.kafka_options())
     air_forecast_df = spark_utils.preprocessing_air_forecast(air_forecast_raw)
 
-    air_fc_s3_checkpoint = f"s3a://{spark_utils.bucket}/air-forecast/_checkpoint_s3"
+    # update mode + watermark : only changed (region, date, publish time) rows, bounded state
+    air_fc_s3_checkpoint = f"s3a://{spark_utils.bucket}/air-forecast/_checkpoint"
     air_fc_s3_query = (
-        air_forecast_df
-        .writeStream
-        .foreachBatch(spark_utils.save_batch_to_s3_air_forecast)
-        .outputMode("complete")
+        conf.apply(air_forecast_df.writeStream)
+        .foreachBatch(conf.pooled(spark_utils.save_batch_to_s3_air_forecast))
+        .outputMode("update")
         .option("checkpointLocation", air_fc_s3_checkpoint)
         .start()
     )
@@ -159,32 +174,26 @@ def run_air_forecast_stream(spark_utils, spark):
     log.info("Air-forecast streaming started.")
     return [air_fc_s3_query]
 
-def run_air_summary_stream(spark_utils, spark):
+def run_air_summary_stream(spark_utils, spark, trigger=None):
     log.info("Initializing air-summary stream...")
-    air_realtime_raw = spark_utils.read_kafka_topic(spark, "air-quality-realtime")
-    air_realtime_df = spark_utils.preprocessing_air_realtime(air_realtime_raw)
+    conf = StreamConfig.load("air_summary", trigger)
+    state_conf = StreamConfig.load("air_forecast_state", trigger)
 
-    def get_latest_forecast_path(spark_session, base_path):
-        jvm = spark_session._jvm
-        conf = spark_session._jsc.hadoopConfiguration()
-        fs = jvm.org.apache.hadoop.fs.FileSystem.get(jvm.java.net.URI(base_path), conf)
-        path = jvm.org.apache.hadoop.fs.Path(base_path)
-
-        if not fs.exists(path):
-            return None
-
-        latest_value = None
-        for status in fs.listStatus(path):
-            name = status.getPath().getName()
-            if name.startswith("data_time_yyyymmddhh="):
-                value = name.split("=", 1)[1]
-                if latest_value is None or value > latest_value:
-                    latest_value = value
+    air_realtime_raw = spark_utils.read_kafka_topic(spark, "air-quality-realtime", **conf.kafka_options())
+    air_realtime_df = spark_utils.preprocessing_air_realtime(air_realtime_raw)
 
-        if latest_value is None:
-            return None
+    # S3 snapshot only seeds the state, the forecast topic keeps it up to date
+    forecast_cache = AirForecastCache(
+        spark,
+        f"s3a://{spark_utils.bucket}/air-forecast/hourly-data"
+    )
 
-        return f"{base_path}/data_time_yyyymmddhh={latest_value}"
+    def update_forecast_state(batch_df, batch_id):
+        if batch_df is None or batch_df.rdd.isEmpty():
+            return
+        # batch_df is a static dataframe here, both aggregations run on this batch only
+        forecast_df = spark_utils.preprocessing_air_forecast(batch_df)
+        forecast_cache.update(forecast_df)
 
     def write_air_summary(batch_df, batch_id):
         if batch_df is None or batch_df.rdd.isEmpty():
@@ -192,20 +201,9 @@ def run_air_summary_stream(spark_utils, spark):
             return
 
         batch_df = batch_df.withColumn("obs_date", to_date(col("obs_ts")))
-        s3_path = f"s3a://{spark_utils.bucket}/air-forecast/hourly-data"
-        spark_session = batch_df.sparkSession
-        forecast_df = None
-
-        try:
-            latest_path = get_latest_forecast_path(spark_session, s3_path)
-            if latest_path is None:
-                log.warning(f"Batch {batch_id}: No air-forecast partitions found at {s3_path}")
-            else:
-                forecast_df = spark_session.read.parquet(latest_path)
-        except Exception:
-            log.warning(f"Batch {batch_id}: No air-forecast snapshot found at {s3_path}")
-
-        if forecast_df is None or forecast_df.rdd.isEmpty():
+        forecast_latest = forecast_cache.get()
+
+        if forecast_latest is None:
             joined = (
                 batch_df
                 .withColumn("pm10_forecast_grade", lit(""))
@@ -214,13 +212,7 @@ def run_air_summary_stream(spark_utils, spark):
                 .withColumn("inform_date", lit(None).cast("date"))
             )
         else:
-            w = Window.partitionBy("region", "inform_date").orderBy(col("data_time_ts").desc())
-            forecast_latest = (
-                forecast_df
-                .withColumn("rn", row_number().over(w))
-                .filter(col("rn") == 1)
-                .drop("rn")
-            )
+            forecast_latest = broadcast(forecast_latest)
             joined = batch_df.join(
                 forecast_latest,
                 (batch_df.sido_name == forecast_latest.region) &
@@ -252,40 +244,140 @@ def run_air_summary_stream(spark_utils, spark):
 
         spark_utils.save_batch_to_redis_air_summary(joined, batch_id)
 
+    air_fc_state_checkpoint = f"s3a://{spark_utils.bucket}/air-summary/_checkpoint_forecast_state"
+    air_fc_state_query = (
+        state_conf.apply(
+            spark_utils.read_kafka_topic(spark, "air-quality-forecast", **state_conf.kafka_options())
+            .writeStream
+        )
+        .foreachBatch(state_conf.pooled(update_forecast_state))
+        .option("checkpointLocation", air_fc_state_checkpoint)
+        .start()
+    )
+
     air_sum_checkpoint = f"s3a://{spark_utils.bucket}/air-summary/_checkpoint_redis"
     air_sum_query = (
-        air_realtime_df
-        .writeStream
-        .foreachBatch(write_air_summary)
+        conf.apply(air_realtime_df.writeStream)
+        .foreachBatch(conf.pooled(write_air_summary))
         .outputMode("update")
         .option("checkpointLocation", air_sum_checkpoint)
         .start()
     )
 
     log.info("Air-summary streaming started.")
-    return [air_sum_query]
-
-def main():
-    spark_utils = Spark_utils()
-    spark = spark_utils.get_spark("weather_streaming_app")
-
-    log.info("Starting weather + forecast + air-realtime + air-forecast + air-summary streams...")
+    return [air_fc_state_query, air_sum_query]
 
-    # read music df
-    music_df = spark_utils.get_music_data(spark)
+def run_streams(spark_utils, spark, names, trigger=None):
+    """
+        Start the pipelines in `names` and return their queries
+        param
+            spark_utils : Spark_utils
+            spark : Spark session
+            names : pipeline names (see STREAMS)
+            trigger : Trigger forced on every query, None for the per query config
+    """
+    queries = []
+    for name in names:
+        if name == "weather":
+            # read music df
+            music_df = spark_utils.get_music_data(spark)
+            queries += run_weather_stream(spark_utils, spark, music_df, trigger)
+        elif name == "forecast":
+            queries += run_forecast_stream(spark_utils, spark, trigger)
+        elif name == "air_realtime":
+            queries += run_air_realtime_stream(spark_utils, spark, trigger)
+        elif name == "air_forecast":
+            queries += run_air_forecast_stream(spark_utils, spark, trigger)
+        elif name == "air_summary":
+            queries += run_air_summary_stream(spark_utils, spark, trigger)
+    return queries
+
+
+def run_available_now(spark_utils, names):
+    """
+        Batch entry point : drain what is in Kafka with Trigger.AvailableNow then exit.
+        The queries keep their streaming checkpoints, so offsets and state carry over
+        between runs exactly as for the always-on queries.
+        Nothing scrapes a short-lived app : each query's progress and the sink timings are
+        logged as one json line and pushed to SPARK_METRICS_PUSHGATEWAY when set
+        param
+            spark_utils : Spark_utils
+            names : pipeline names (see STREAMS)
+    """
+    spark = spark_utils.get_spark(f"weather_batch_{'_'.join(names)}")
+    log.info(f"Running {names} with availableNow...")
+
+    queries = run_streams(spark_utils, spark, names, AVAILABLE_NOW)
+    summaries = []
+    try:
+        # Raises if a query failed, so the Airflow task fails with it
+        for query in queries:
+            query.awaitTermination()
+            summaries.append(record_progress(query.name, query.recentProgress))
+    finally:
+        log.info(json.dumps({
+            "event": "available_now_metrics",
+            "streams": names,
+            "summaries": summaries,
+            **REGISTRY.snapshot(),
+        }, default=str))
+        push_metrics("weather_available_now", "_".join(names))
+        spark.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Weather / forecast / air-quality streaming")
+    parser.add_argument(
+        "--streams",
+        nargs="+",
+        choices=STREAMS,
+        metavar="STREAM",
+        help="Pipelines started by this app, default every pipeline not in SPARK_BATCH_STREAMS",
+    )
+    parser.add_argument(
+        "--available-now",
+        nargs="+",
+        choices=STREAMS,
+        metavar="STREAM",
+        help=f"Run these pipelines once with Trigger.AvailableNow and exit ({', '.join(STREAMS)})",
+    )
+    return parser.parse_args(argv)
 
-    # Start both streaming pipelines
-    weather_queries = run_weather_stream(spark_utils, spark, music_df)
-    forecast_queries = run_forecast_stream(spark_utils, spark)
-    air_realtime_queries = run_air_realtime_stream(spark_utils, spark)
-    air_forecast_queries = run_air_forecast_stream(spark_utils, spark)
-    air_summary_queries = run_air_summary_stream(spark_utils, spark)
 
-    # Wait for termination from any stream
-    all_queries = weather_queries + forecast_queries + air_realtime_queries + air_forecast_queries + air_summary_queries
+def main(argv=None):
+    args = parse_args(argv)
+    spark_utils = Spark_utils()
 
-    for q in all_queries:
-        q.awaitTermination()
+    if args.available_now:
+        run_available_now(spark_utils, args.available_now)
+        return
+
+    if args.streams:
+        # One app per group of pipelines, each with its own spark-submit resources
+        names = list(args.streams)
+        app_name = f"weather_streaming_{'_'.join(names)}"
+    else:
+        # Pipelines scheduled by Airflow as availableNow batches must not run here too,
+        # both would share the same checkpoint
+        batch_streams = {
+            name.strip() for name in
+            os.getenv("SPARK_BATCH_STREAMS", "weather,forecast,air_forecast").split(",")
+            if name.strip()
+        }
+        names = [name for name in STREAMS if name not in batch_streams]
+        app_name = "weather_streaming_app"
+
+    spark = spark_utils.get_spark(app_name)
+
+    # Per query rates / durations / state + sink timings on :SPARK_METRICS_PORT/metrics
+    start_metrics_exporter(spark)
+
+    log.info(f"Starting {names} streams...")
+    all_queries = run_streams(spark_utils, spark, names)
+    log.info(f"Started {len(all_queries)} queries: {[q.name for q in all_queries]}")
+
+    # Wait for termination from any stream, a failed query stops the app (restarted by compose)
+    spark.streams.awaitAnyTermination()
 
 
 if __name__ == "__main__":
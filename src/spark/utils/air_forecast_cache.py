@@ -0,0 +1,186 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from py4j.protocol import Py4JError
+from pyspark.errors import PySparkException
+from pyspark.sql.functions import col, row_number
+from pyspark.sql.types import (
+    DateType,
+    StringType,
+    StructField,
+    StructType,
+    TimestampType,
+)
+from pyspark.sql.window import Window
+
+# Columns joined into the air-summary
+FORECAST_SCHEMA = StructType([
+    StructField("region", StringType()),
+    StructField("inform_date", DateType()),
+    StructField("data_time_ts", TimestampType()),
+    StructField("pm10_forecast_grade", StringType()),
+    StructField("pm25_forecast_grade", StringType()),
+    StructField("forecast_mask_required", StringType()),
+])
+FORECAST_COLUMNS = FORECAST_SCHEMA.fieldNames()
+
+
+class AirForecastCache:
+    """
+        Driver-side versioned state of the latest air forecast per (region, inform_date).
+
+        The state is fed by the air-quality-forecast stream through update(), so a
+        new forecast is joinable as soon as its micro-batch ends. The S3 snapshot only
+        seeds it: the prefix is listed at most once per `check_interval_min` and a
+        partition is read only when a newer data_time_yyyymmddhh appears.
+        update() and get() are called from different query threads.
+    """
+
+    PARTITION_PREFIX = "data_time_yyyymmddhh="
+    KEEP_DAYS = 2
+
+    def __init__(self, spark, base_path, check_interval_min = None):
+        """
+            param
+                spark : Spark session
+                base_path : s3a path of air-forecast/hourly-data
+                check_interval_min : Minutes between S3 listings (AIR_FORECAST_CHECK_MIN, default 10)
+        """
+        self.spark = spark
+        self.base_path = base_path
+        self.check_interval = 60 * float(
+            check_interval_min if check_interval_min is not None
+            else os.getenv("AIR_FORECAST_CHECK_MIN", "10")
+        )
+        self.log = logging.getLogger("air-forecast-cache")
+
+        self.lock = threading.Lock()
+        self.state = {}         # (region, inform_date) -> Row
+        self.df = None          # dataframe over the local rows, None until a forecast is known
+        self.version = 0        # bumped on every change of the state
+        self.partition = None   # newest S3 partition merged so far
+        self.checked_at = None
+
+    def _latest_partition(self):
+        """
+            Return the newest data_time_yyyymmddhh value under base_path
+        """
+        jvm = self.spark._jvm
+        conf = self.spark._jsc.hadoopConfiguration()
+        fs = jvm.org.apache.hadoop.fs.FileSystem.get(jvm.java.net.URI(self.base_path), conf)
+        path = jvm.org.apache.hadoop.fs.Path(self.base_path)
+
+        if not fs.exists(path):
+            return None
+
+        latest_value = None
+        for status in fs.listStatus(path):
+            name = status.getPath().getName()
+            if name.startswith(self.PARTITION_PREFIX):
+                value = name.split("=", 1)[1]
+                if latest_value is None or value > latest_value:
+                    latest_value = value
+        return latest_value
+
+    def _load(self, partition):
+        """
+            Read one S3 partition, latest forecast per (region, inform_date)
+            param
+                partition : data_time_yyyymmddhh value
+        """
+        forecast_df = self.spark.read.parquet(f"{self.base_path}/{self.PARTITION_PREFIX}{partition}")
+
+        w = Window.partitionBy("region", "inform_date").orderBy(col("data_time_ts").desc())
+        return (
+            forecast_df
+            .withColumn("rn", row_number().over(w))
+            .filter(col("rn") == 1)
+            .select(FORECAST_COLUMNS)
+            .collect()
+        )
+
+    def _merge(self, rows):
+        """
+            Keep the newest data_time_ts per (region, inform_date), drop old dates.
+            Must be called with the lock held. Return the number of changed keys
+            param
+                rows : Rows with FORECAST_COLUMNS
+        """
+        changed = 0
+        for row in rows:
+            if row["region"] is None or row["inform_date"] is None:
+                continue
+            key = (row["region"], row["inform_date"])
+            current = self.state.get(key)
+            newer = (
+                current is None
+                or current["data_time_ts"] is None
+                or (row["data_time_ts"] is not None and row["data_time_ts"] >= current["data_time_ts"])
+            )
+            if newer and current != row:
+                self.state[key] = row
+                changed += 1
+
+        oldest = date.today() - timedelta(days=self.KEEP_DAYS)
+        for key in [k for k in self.state if k[1] < oldest]:
+            del self.state[key]
+            changed += 1
+
+        if changed:
+            self.df = (
+                self.spark.createDataFrame(list(self.state.values()), FORECAST_SCHEMA)
+                if self.state else None
+            )
+            self.version += 1
+        return changed
+
+    def update(self, forecast_df):
+        """
+            Merge a preprocessed air-forecast batch into the state
+            param
+                forecast_df : output of Spark_utils.preprocessing_air_forecast
+        """
+        rows = forecast_df.select(FORECAST_COLUMNS).collect()
+        with self.lock:
+            changed = self._merge(rows)
+            version = self.version
+
+        if changed:
+            self.log.info(f"Air-forecast state v{version}: {changed} keys updated")
+        return changed
+
+    def _seed_from_s3(self):
+        """
+            Merge the newest S3 snapshot if it has not been merged yet
+        """
+        latest = self._latest_partition()
+        if latest is None:
+            self.log.warning(f"No air-forecast partitions found at {self.base_path}")
+            return
+        if self.partition is not None and latest <= self.partition:
+            return
+
+        rows = self._load(latest)
+        with self.lock:
+            changed = self._merge(rows)
+            self.partition = latest
+        self.log.info(f"Merged air-forecast snapshot {latest} ({len(rows)} rows, {changed} keys updated)")
+
+    def get(self):
+        """
+            Return the forecast dataframe (or None), checking S3 if due
+        """
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.check_interval:
+            self.checked_at = now
+            try:
+                self._seed_from_s3()
+            except (Py4JError, PySparkException) as e:
+                # Keep serving the current state
+                self.log.warning(f"Air-forecast snapshot refresh failed at {self.base_path}: {e}")
+
+        with self.lock:
+            return self.df
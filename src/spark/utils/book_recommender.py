@@ -12,8 +12,12 @@
 
 from __future__ import annotations
 
+import os
+import time
+import logging
 from functools import reduce
 
+from py4j.protocol import Py4JError
 from pyspark.sql import DataFrame, SparkSession
 from pyspark.sql.functions import (
     col, lit, when,
@@ -22,10 +26,9 @@ from pyspark.sql.functions import (
     sha2, substring, conv,
     pmod, broadcast,
     size, element_at,
-    greatest
+    greatest, create_map, array,
+    struct
 )
-from pyspark.sql.types import ArrayType, StringType
-from pyspark.sql.functions import udf
 
 # 대표 장르 > 세부 장르 매핑
 REP_GENRE_MAP = {
@@ -40,9 +43,18 @@ REP_GENRE_MAP = {
 }
 DEFAULT_REP_GENRE = "LITERATURE_FICTION"
 
-@udf(returnType=ArrayType(StringType()))
-def rep_to_subgenre(rep_genre: str):
-    return REP_GENRE_MAP.get(rep_genre, REP_GENRE_MAP[DEFAULT_REP_GENRE])
+def rep_to_subgenre(rep_genre):
+    """
+        대표 장르 -> 세부 장르 목록 (map literal + element_at, Python UDF 없이 JVM에서 처리)
+        매핑에 없는 장르는 DEFAULT_REP_GENRE의 세부 장르 사용
+    """
+    genre_map = create_map(*[
+        e
+        for rep, subs in REP_GENRE_MAP.items()
+        for e in (lit(rep), array(*[lit(s) for s in subs]))
+    ])
+    default = array(*[lit(s) for s in REP_GENRE_MAP[DEFAULT_REP_GENRE]])
+    return coalesce(element_at(genre_map, rep_genre), default)
 
 # 장르 점수 기준
 GENRE_SCORE_CONFIG = {
@@ -83,30 +95,89 @@ GENRE_SCORE_CONFIG = {
 # Book Recommender
 class BookRecommender:
 
-    def __init__(self, spark: SparkSession, bucket: str):
+    def __init__(self, spark: SparkSession, bucket: str, check_interval_hours: float | None = None):
         self.spark = spark
         self.bucket = bucket
-        self.booklist_path = f"s3a://{bucket}/BookList/*/*.parquet"
+        self.booklist_root = f"s3a://{bucket}/BookList"
+        self.booklist_path = f"{self.booklist_root}/*/*.parquet"
+        self.log = logging.getLogger("book-recommender")
+
+        # BookList는 주 1회(fetch_booklist_dag) 갱신 -> S3 변경 여부는 N시간마다 확인
+        self.check_interval = 3600 * float(
+            check_interval_hours if check_interval_hours is not None
+            else os.getenv("BOOKLIST_CHECK_HOURS", "6")
+        )
+        self._checked_at = None
+        self._booklist_version = None        # (modification time, path) of the newest parquet
 
-        # Tier cache
+        # Tier cache (collect 후 로컬 DataFrame으로 보관 -> 배치마다 broadcast join만 수행)
         self._tier1_top_by_genre_df = None   # (genre -> top1)
         self._tier2_top_by_rep_df = None     # (rep_genre -> top1 among its subgenres)
         self._tier3_global_top_df = None     # (single row) global default top1
 
-    # S3에 저장된 장르별 TOP eBook 로딩 (+ fallback tier 구축)
-    def _load_top_ebook_df(self):
-        if (
+    def _latest_booklist_object(self):
+        """
+            S3 BookList 하위에서 가장 최근에 수정된 parquet 객체 (modification time, path)
+        """
+        jvm = self.spark._jvm
+        conf = self.spark._jsc.hadoopConfiguration()
+        fs = jvm.org.apache.hadoop.fs.FileSystem.get(jvm.java.net.URI(self.booklist_root), conf)
+        path = jvm.org.apache.hadoop.fs.Path(self.booklist_root)
+
+        if not fs.exists(path):
+            return None
+
+        latest = None
+        files = fs.listFiles(path, True)
+        while files.hasNext():
+            status = files.next()
+            name = status.getPath().toString()
+            if name.endswith(".parquet"):
+                version = (status.getModificationTime(), name)
+                if latest is None or version > latest:
+                    latest = version
+        return latest
+
+    def _materialize(self, df: DataFrame) -> DataFrame:
+        """
+            작은 tier 테이블을 driver로 collect 후 로컬 DataFrame으로 재생성 (S3 lineage 제거)
+        """
+        return self.spark.createDataFrame(df.collect(), df.schema)
+
+    def _tiers_loaded(self):
+        return (
             self._tier1_top_by_genre_df is not None
             and self._tier2_top_by_rep_df is not None
             and self._tier3_global_top_df is not None
+        )
+
+    # S3에 저장된 장르별 TOP eBook 로딩 (+ fallback tier 구축)
+    def _load_top_ebook_df(self):
+        now = time.monotonic()
+        if (
+            self._tiers_loaded()
+            and self._checked_at is not None
+            and now - self._checked_at < self.check_interval
         ):
             return
+        self._checked_at = now
+
+        try:
+            latest = self._latest_booklist_object()
+        except Py4JError as e:
+            if self._tiers_loaded():
+                self.log.warning(f"BookList listing failed, keep current tiers: {e}")
+                return
+            latest = None
+
+        if self._tiers_loaded() and latest == self._booklist_version:
+            return
 
         from pyspark.sql.window import Window
         from pyspark.sql.functions import row_number, explode
 
         books = self.spark.read.parquet(self.booklist_path)
-        ebooks = books.filter(col("has_ebook"))
+        ebooks = books.filter(col("has_ebook")).cache()   # tier 3개 계산 동안만 캐시
 
         # Tier1: genre(=sub genre)별 top1
         w1 = Window.partitionBy("genre").orderBy(col("bestRank").cast("int").asc())
@@ -170,34 +241,34 @@ class BookRecommender:
             )
         )
 
-        self._tier1_top_by_genre_df = tier1
-        self._tier2_top_by_rep_df = tier2
-        self._tier3_global_top_df = tier3
+        self._tier1_top_by_genre_df = self._materialize(tier1)
+        self._tier2_top_by_rep_df = self._materialize(tier2)
+        self._tier3_global_top_df = self._materialize(tier3)
+        self._booklist_version = latest
+        ebooks.unpersist()
+
+        self.log.info(f"Loaded book tiers from {self.booklist_path} (newest object: {latest})")
 
     # 메인 추천 로직
+    # withColumn 체인 대신 단계별 select 4번으로 구성 (배치마다 분석되는 plan 깊이 축소)
     def add_recommendation(self, df: DataFrame):
 
         # 환경 Context - 계절/시간대
-        df = (
-            df
-            .withColumn("month", month(col("obs_ts")))
-            .withColumn("hour", hour(col("obs_ts")))
-            .withColumn(
-                "season",
-                when(col("month").isin(3, 4, 5), "spring")
-                .when(col("month").isin(6, 7, 8), "summer")
-                .when(col("month").isin(9, 10, 11), "fall")
-                .otherwise("winter")
-            )
-            .withColumn(
-                "daypart",
-                when(col("hour").between(6, 11), "morning")
-                .when(col("hour").between(12, 17), "afternoon")
-                .when(col("hour").between(18, 23), "evening")
-                .otherwise("night")
-            )
-            .drop("month", "hour")
+        month_ = month(col("obs_ts"))
+        hour_ = hour(col("obs_ts"))
+        season = (
+            when(month_.isin(3, 4, 5), "spring")
+            .when(month_.isin(6, 7, 8), "summer")
+            .when(month_.isin(9, 10, 11), "fall")
+            .otherwise("winter")
+        )
+        daypart = (
+            when(hour_.between(6, 11), "morning")
+            .when(hour_.between(12, 17), "afternoon")
+            .when(hour_.between(18, 23), "evening")
+            .otherwise("night")
         )
+        df = df.select("*", season.alias("season"), daypart.alias("daypart"))
 
         # 환경 Context - 날씨
         ta = coalesce(col("ta"), lit(15.0))
@@ -214,58 +285,65 @@ class BookRecommender:
         )
         hot = (ta >= 30) | ((col("daypart") == "night") & (ta >= 25))
 
-        df = (df
-            .withColumn("is_rainy", (rn > 0) | (col("pop") >= 60))
-            .withColumn("is_snowy", col("sd_tot") > 0)
-            .withColumn("is_windy", ws >= 6)
-            .withColumn("is_humid", hm >= 75)
-            .withColumn("is_cold", ta <= 5)
-            .withColumn("is_hot", ta >= 30)
-            .withColumn("is_mild", ta.between(10, 24))
-            .withColumn("is_clear", sky.isin(1, 2))
-            .withColumn("is_cloudy", sky >= 4)
-        )
+        context = {
+            "is_rainy": (rn > 0) | (col("pop") >= 60),
+            "is_snowy": col("sd_tot") > 0,
+            "is_windy": ws >= 6,
+            "is_humid": hm >= 75,
+            "is_cold": ta <= 5,
+            "is_hot": ta >= 30,
+            "is_mild": ta.between(10, 24),
+            "is_clear": sky.isin(1, 2),
+            "is_cloudy": sky >= 4,
+        }
 
         # Latent State 계산
-        df = (df
-            .withColumn(        # Valence : 정서적 긍부정도
-                "valence",
+        latent = {
+            # Valence : 정서적 긍부정도
+            "valence": (
                 when(sunny, 0.8)
                 .when(cool, 0.65)
                 .when(hot, 0.35)
                 .when(cloudy, 0.4)
                 .otherwise(0.55)
-            )
-            .withColumn(        # Arousal : 자극/활성도
-                "arousal",
+            ),
+            # Arousal : 자극/활성도
+            "arousal": (
                 when(hot & (col("daypart") == "afternoon"), 0.75)
                 .otherwise(0.55)
-            )
-            .withColumn(        # Dominance : 통제감
-                "dominance",
+            ),
+            # Dominance : 통제감
+            "dominance": (
                 when(hot, 0.45)
                 .when(cool, 0.7)
                 .otherwise(0.6)
-            )
-            .withColumn(        # Cognitive Load : 인지 부하(부담)
-                "cognitive_load",
+            ),
+            # Cognitive Load : 인지 부하(부담)
+            "cognitive_load": (
                 when(cool & col("daypart").isin("morning", "afternoon"), 0.75)
                 .when(sunny, 0.7)
                 .when(cloudy, 0.45)
                 .otherwise(0.55)
-            )
-            .withColumn(        # Avoidance : 회피
-                "avoidance",
+            ),
+            # Avoidance : 회피
+            "avoidance": (
                 when(hot, 0.85)
                 .when(cloudy, 0.65)
                 .when(cool, 0.3)
                 .otherwise(0.2)
-            )
+            ),
+        }
+
+        df = df.select(
+            "*",
+            *[e.alias(name) for name, e in context.items()],
+            *[e.alias(name) for name, e in latent.items()],
         )
 
-        # 장르 점수 계산
-        score_cols = []
-        for genre, conf in GENRE_SCORE_CONFIG.items():
+        # 장르 점수 계산 + 최고 점수 장르 선택 (argmax 1회)
+        # struct 비교: score 큰 순 -> 동점이면 config 순서가 앞선 장르 (-idx)
+        candidates = []
+        for idx, (genre, conf) in enumerate(GENRE_SCORE_CONFIG.items()):
             exprs = []
 
             for k, w in conf.get("context", {}).items():
@@ -281,36 +359,32 @@ class BookRecommender:
                 else:
                     exprs.append(w * col(k))
 
-            score_col = f"score_{genre.lower()}"
-            df = df.withColumn(score_col, reduce(lambda a, b: a + b, exprs))
-            score_cols.append((genre, score_col))
-
-        # 최고 점수의 장르 선택
-        rep_expr = None
-        for genre, score in score_cols:
-            condition = col(score) == greatest(*[col(c) for _, c in score_cols])
-            rep_expr = when(condition, genre) if rep_expr is None else rep_expr.when(condition, genre)
+            candidates.append(
+                struct(
+                    reduce(lambda a, b: a + b, exprs).alias("score"),
+                    lit(-idx).alias("order"),
+                    lit(genre).alias("genre"),
+                )
+            )
 
-        df = df.withColumn("rep_genre", rep_expr.otherwise(DEFAULT_REP_GENRE))
+        # greatest는 컬럼으로 한 번만 계산 (score/genre 두 번 참조 시 식이 복제되어 행마다 재계산됨)
+        df = df.select("*", greatest(*candidates).alias("best_genre"))
+        df = df.select(
+            "*",
+            # 모든 점수가 null이면 기본 장르
+            when(col("best_genre.score").isNotNull(), col("best_genre.genre"))
+            .otherwise(DEFAULT_REP_GENRE)
+            .alias("rep_genre"),
+        )
 
         # 대표 장르 > 서브 장르 선택 - hash 기반 결정
-        df = df.withColumn("sub_genres", rep_to_subgenre(col("rep_genre")))
-        df = df.withColumn("sub_size", size(col("sub_genres")))
+        sub_genres = rep_to_subgenre(col("rep_genre"))
 
         seed = concat_ws("::", col("stn_id"), col("obs_time"))                  # 같은 지점 + 같은 시간 => 같은 seed
         hash_dec = conv(substring(sha2(seed, 256), 1, 16), 16, 10).cast("long") # 숫자 타입 seed로 변환
+        rec_idx = (pmod(hash_dec, size(sub_genres)) + lit(1)).cast("int")
 
-        df = df.withColumn(
-            "rec_idx",
-            (pmod(hash_dec, col("sub_size")) + lit(1)).cast("int")
-        )
-        df = (df
-            .withColumn(
-                "rec_genre",
-                element_at(col("sub_genres"), col("rec_idx"))
-            )
-            .drop("sub_genres", "sub_size", "rec_idx")
-        )
+        df = df.select("*", element_at(sub_genres, rec_idx).alias("rec_genre"))
 
         # eBook Join
         self._load_top_ebook_df()
@@ -323,7 +397,6 @@ class BookRecommender:
                 df["rec_genre"] == self._tier1_top_by_genre_df["tier1_genre"],
                 "left"
             )
-            .drop("tier1_genre")
         )
 
         # Tier2: rep_genre -> rep_genre에서 top1
@@ -334,7 +407,6 @@ class BookRecommender:
                 df["rep_genre"] == self._tier2_top_by_rep_df["tier2_rep_genre"],
                 "left"
             )
-            .drop("tier2_rep_genre")
         )
 
         # Tier3: global default top1
@@ -348,25 +420,14 @@ class BookRecommender:
         )
 
         # 최종 선택 (Tier1 > Tier2 > Tier3 순)
-        df = (
-            df
-            .withColumn("title", coalesce(col("tier1_title"), col("tier2_title"), col("tier3_title")))
-            .withColumn("author", coalesce(col("tier1_author"), col("tier2_author"), col("tier3_author")))
-            .withColumn("categoryName", coalesce(col("tier1_categoryName"), col("tier2_categoryName"), col("tier3_categoryName")))
-            .withColumn("description", coalesce(col("tier1_description"), col("tier2_description"), col("tier3_description")))
-            .withColumn("ebook_isbn13", coalesce(col("tier1_ebook_isbn13"), col("tier2_ebook_isbn13"), col("tier3_ebook_isbn13")))
-            .withColumn("ebook_link", coalesce(col("tier1_ebook_link"), col("tier2_ebook_link"), col("tier3_ebook_link")))
-            .drop(
-                "tier1_title", "tier1_author", "tier1_categoryName", "tier1_description", "tier1_ebook_isbn13", "tier1_ebook_link",
-                "tier2_title", "tier2_author", "tier2_categoryName", "tier2_description", "tier2_ebook_isbn13", "tier2_ebook_link",
-                "tier3_title", "tier3_author", "tier3_categoryName", "tier3_description", "tier3_ebook_isbn13", "tier3_ebook_link",
-            )
-        )
+        book_fields = ["title", "author", "categoryName", "description", "ebook_isbn13", "ebook_link"]
 
         return df.select(
             "obs_time", "obs_ts", "obs_yyyymmddhh", "stn_id",
             "ws", "ta", "hm", "rn", "sd_tot", "wc", "pop", "sky",
-            "title", "author", "categoryName",
-            "description", "ebook_isbn13", "ebook_link",
+            *[
+                coalesce(col(f"tier1_{f}"), col(f"tier2_{f}"), col(f"tier3_{f}")).alias(f)
+                for f in book_fields
+            ],
             'music_json', 'weather_code'
         )
\ No newline at end of file
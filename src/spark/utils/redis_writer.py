@@ -0,0 +1,204 @@
+import logging
+import time
+
+import redis
+
+# One connection pool per (host, port) and per python process
+# (the driver, or each executor python worker)
+_POOLS = {}
+
+# KEYS[1] value key, KEYS[2] digest key / ARGV[1] value, ARGV[2] digest, ARGV[3] ttl
+# Same digest : only refresh the TTLs and return 0, otherwise SET both and return 1
+SET_IF_CHANGED = """
+if redis.call('GET', KEYS[2]) == ARGV[2] and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+def get_redis_client(host, port):
+    """
+        Return a Redis client backed by a process-wide connection pool
+        param
+            host : Redis host
+            port : Redis port
+    """
+    key = (host, int(port))
+    if key not in _POOLS:
+        _POOLS[key] = redis.ConnectionPool(
+            host=host,
+            port=int(port),
+            decode_responses=True,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+    return redis.Redis(connection_pool=_POOLS[key])
+
+
+class RedisBatchWriter:
+    """
+        Pipelined writer shared by every Redis sink.
+        Commands are sent in non-transactional pipelines of `chunk_size`
+        records, so a whole micro-batch lands in a few round trips.
+    """
+
+    def __init__(self, host, port, chunk_size = 1000, ttl = 86400):
+        """
+            param
+                host : Redis host
+                port : Redis port
+                chunk_size : Records per pipeline round trip
+                ttl : Default TTL in seconds (24 hours)
+        """
+        self.host = host
+        self.port = int(port)
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.log = logging.getLogger("redis-writer")
+
+    def client(self):
+        return get_redis_client(self.host, self.port)
+
+    def write_hashes(self, records, ttl = None):
+        """
+            HSET + EXPIRE for each (key, mapping) record
+            param
+                records : iterable of (key, mapping)
+                ttl : TTL in seconds, default self.ttl
+        """
+        ttl = ttl or self.ttl
+
+        def queue(pipe, record):
+            key, mapping = record
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+
+        return self._write(records, queue)
+
+    def write_strings(self, records, ttl = None):
+        """
+            SET with EX for each (key, value) record
+            param
+                records : iterable of (key, value)
+                ttl : TTL in seconds, default self.ttl
+        """
+        ttl = ttl or self.ttl
+
+        def queue(pipe, record):
+            key, value = record
+            pipe.set(key, value, ex=ttl)
+
+        return self._write(records, queue)
+
+    def write_strings_if_changed(self, records, ttl = None):
+        """
+            SET only the values whose digest differs from the stored one,
+            unchanged values only get their TTL refreshed (server-side Lua, no extra round trip)
+            param
+                records : iterable of (key, value, digest_key, digest)
+                ttl : TTL in seconds, default self.ttl
+        """
+        ttl = ttl or self.ttl
+        set_if_changed = self.client().register_script(SET_IF_CHANGED)
+
+        def queue(pipe, record):
+            key, value, digest_key, digest = record
+            set_if_changed(keys=[key, digest_key], args=[value, digest, ttl], client=pipe)
+
+        def count_changed(results):
+            return sum(1 for r in results if r == 1)
+
+        return self._write(records, queue, count_changed)
+
+    def write(self, kind, records, ttl = None):
+        """
+            Dispatch to the writer of `kind`
+            param
+                kind : hash | string | string_if_changed
+                records : iterable of records of that kind
+                ttl : TTL in seconds, default self.ttl
+        """
+        writers = {
+            "hash": self.write_hashes,
+            "string": self.write_strings,
+            "string_if_changed": self.write_strings_if_changed,
+        }
+        return writers[kind](records, ttl)
+
+    def _write(self, records, queue, count_changed = None):
+        """
+            Queue records into pipelines of chunk_size and execute them
+            Return the write stats of the batch
+            param
+                records : iterable of records
+                queue : callable(pipe, record) adding the commands of one record
+                count_changed : callable(results) counting the records actually written,
+                                every record counts as changed when None
+        """
+        started = time.perf_counter()
+        stats = {"rows": 0, "errors": 0, "round_trips": 0, "changed": 0}
+
+        pipe = self.client().pipeline(transaction=False)
+        pending = 0
+
+        def flush():
+            results = self._execute(pipe, stats)
+            stats["rows"] += pending
+            stats["changed"] += count_changed(results) if count_changed else pending
+
+        for record in records:
+            queue(pipe, record)
+            pending += 1
+            if pending >= self.chunk_size:
+                flush()
+                pending = 0
+
+        if pending:
+            flush()
+
+        stats["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return stats
+
+    def _execute(self, pipe, stats):
+        results = pipe.execute(raise_on_error=False)
+        stats["round_trips"] += 1
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            stats["errors"] += len(errors)
+            self.log.error(f"{len(errors)} Redis commands failed, first error: {errors[0]}")
+        return results
+
+
+def partition_writer(host, port, to_record, kind = "hash", chunk_size = 1000, ttl = 86400):
+    """
+        Build the mapPartitions function used by executors to write their own partition.
+        Each partition yields one (rows, errors, round_trips, changed) tuple, the driver only sums them
+        param
+            host : Redis host
+            port : Redis port
+            to_record : module level function row -> record of `kind`
+            kind : hash | string | string_if_changed (see RedisBatchWriter.write)
+            chunk_size : Records per pipeline round trip
+            ttl : TTL in seconds
+    """
+    def write_partition(rows):
+        log = logging.getLogger("redis-writer")
+
+        def records():
+            for row in rows:
+                try:
+                    yield to_record(row)
+                except (KeyError, ValueError, TypeError) as row_error:
+                    log.error(f"Error building row for Redis: {row_error}")
+
+        writer = RedisBatchWriter(host, port, chunk_size=chunk_size, ttl=ttl)
+        stats = writer.write(kind, records())
+        yield (stats["rows"], stats["errors"], stats["round_trips"], stats["changed"])
+
+    return write_partition
@@ -0,0 +1,216 @@
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# dataset -> (table path under the bucket, hour partition column, sort key)
+COMPACTION_DATASETS = {
+    "kma-weather": ("kma-weather/hourly-data", "obs_yyyymmddhh", "stn_id"),
+    "air-realtime": ("air-realtime/hourly-data", "obs_yyyymmddhh", "station_code"),
+}
+
+# Partition values are KST hours
+KST = ZoneInfo("Asia/Seoul")
+
+# Spark skips paths starting with "_" during partition discovery
+MANIFEST_DIR = "_manifest"
+STAGING_DIR = "_compaction_tmp"
+
+
+class ParquetCompactor:
+    """
+        Rewrite the closed hour partitions of an append-only parquet table
+        (one small file per micro-batch) into a few files sorted by the row key,
+        and record every compacted partition in a per-day manifest.
+
+        The swap never loses rows : compacted files are moved in first, then only the
+        files that were read are deleted, so a micro-batch landing meanwhile is kept.
+        A failed rename rolls the moved files back and keeps every input.
+        Readers listing the partition during the swap can see both copies for a moment.
+    """
+
+    def __init__(self, spark, bucket, dataset, target_file_mb = None, grace_hours = None):
+        """
+            param
+                spark : Spark session
+                bucket : S3 bucket
+                dataset : key of COMPACTION_DATASETS
+                target_file_mb : Target size of a compacted file (COMPACTION_TARGET_FILE_MB, default 128)
+                grace_hours : Hours after the end of an hour before it is closed (COMPACTION_GRACE_HOURS, default 2)
+        """
+        table, self.partition_col, self.sort_key = COMPACTION_DATASETS[dataset]
+        self.spark = spark
+        self.dataset = dataset
+        self.base_path = f"s3a://{bucket}/{table}"
+        self.target_bytes = 1024 * 1024 * float(
+            target_file_mb if target_file_mb is not None
+            else os.getenv("COMPACTION_TARGET_FILE_MB", "128")
+        )
+        self.grace = timedelta(hours=float(
+            grace_hours if grace_hours is not None
+            else os.getenv("COMPACTION_GRACE_HOURS", "2")
+        ))
+        self.log = logging.getLogger("s3-compaction")
+
+        jvm = spark._jvm
+        self.Path = jvm.org.apache.hadoop.fs.Path
+        self.jvm = jvm
+        self.fs = jvm.org.apache.hadoop.fs.FileSystem.get(
+            jvm.java.net.URI(self.base_path), spark._jsc.hadoopConfiguration()
+        )
+
+    def _data_files(self, partition_path):
+        """
+            Return [(path, size)] of the parquet files directly under a partition
+        """
+        return [
+            (status.getPath().toString(), status.getLen())
+            for status in self.fs.listStatus(self.Path(partition_path))
+            if status.isFile() and status.getPath().getName().endswith(".parquet")
+        ]
+
+    def _closed_partitions(self, day, now):
+        """
+            Hour partition values of `day` (yyyymmdd) whose hour ended more than grace ago
+            param
+                day : yyyymmdd
+                now : current KST datetime (naive)
+        """
+        prefix = f"{self.partition_col}={day}"
+        values = []
+        for status in self.fs.listStatus(self.Path(self.base_path)):
+            name = status.getPath().getName()
+            if not (status.isDirectory() and name.startswith(prefix)):
+                continue
+            value = name.split("=", 1)[1]
+            hour_end = datetime.strptime(value, "%Y%m%d%H") + timedelta(hours=1)
+            if hour_end + self.grace <= now:
+                values.append(value)
+        return sorted(values)
+
+    def _target_files(self, input_bytes):
+        return max(1, math.ceil(input_bytes / self.target_bytes))
+
+    def compact_partition(self, value):
+        """
+            Compact one hour partition, return its manifest entry or None if already compact
+            param
+                value : partition value (yyyymmddhh)
+        """
+        partition_path = f"{self.base_path}/{self.partition_col}={value}"
+        inputs = self._data_files(partition_path)
+        input_bytes = sum(size for _, size in inputs)
+        n_files = self._target_files(input_bytes)
+        if len(inputs) <= n_files:
+            return None
+
+        started = time.perf_counter()
+        staging = f"{self.base_path}/{STAGING_DIR}/{self.partition_col}={value}"
+        self.fs.delete(self.Path(staging), True)
+
+        df = self.spark.read.parquet(*[path for path, _ in inputs])
+        rows = df.count()
+        (
+            df
+            .repartitionByRange(n_files, self.sort_key)
+            .sortWithinPartitions(self.sort_key)
+            .write
+            .mode("overwrite")
+            .option("compression", "snappy")
+            .parquet(staging)
+        )
+
+        # Move the compacted files in, then drop exactly the files that were read.
+        # rename reports failure by returning false, not by raising : on failure the
+        # files already moved are removed again and the inputs are never deleted
+        stamp = int(time.time())
+        outputs = self._data_files(staging)
+        moved = []
+        for path, _ in outputs:
+            name = self.Path(path).getName()
+            target = f"{partition_path}/compacted-{stamp}-{name}"
+            if not self.fs.rename(self.Path(path), self.Path(target)):
+                for done in moved:
+                    self.fs.delete(self.Path(done), False)
+                raise OSError(
+                    f"{self.dataset} {value}: rename {path} -> {target} failed, "
+                    f"inputs kept, staging left at {staging}"
+                )
+            moved.append(target)
+        for path, _ in inputs:
+            self.fs.delete(self.Path(path), False)
+        self.fs.delete(self.Path(staging), True)
+
+        entry = {
+            "partition": f"{self.partition_col}={value}",
+            "rows": rows,
+            "files_before": len(inputs),
+            "files_after": len(outputs),
+            "bytes_before": input_bytes,
+            "bytes_after": sum(size for _, size in outputs),
+            "sort_key": self.sort_key,
+            "compacted_at": datetime.now(KST).isoformat(timespec="seconds"),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        }
+        self.log.info(f"{self.dataset} {value}: {len(inputs)} -> {len(outputs)} files, {rows} rows")
+        return entry
+
+    def _manifest_path(self, day):
+        return f"{self.base_path}/{MANIFEST_DIR}/obs_yyyymmdd={day}.json"
+
+    def read_manifest(self, day):
+        """
+            Return {partition: entry} of the compacted partitions of `day`
+        """
+        path = self.Path(self._manifest_path(day))
+        if not self.fs.exists(path):
+            return {}
+        stream = self.fs.open(path)
+        try:
+            text = self.jvm.org.apache.commons.io.IOUtils.toString(stream, "UTF-8")
+        finally:
+            stream.close()
+        return {entry["partition"]: entry for entry in json.loads(text)["partitions"]}
+
+    def _write_manifest(self, day, entries):
+        body = json.dumps({
+            "dataset": self.dataset,
+            "table": self.base_path,
+            "day": day,
+            "partitions": [entries[k] for k in sorted(entries)],
+        }, ensure_ascii=False, indent=2).encode("utf-8")
+
+        stream = self.fs.create(self.Path(self._manifest_path(day)), True)
+        try:
+            stream.write(bytearray(body))
+        finally:
+            stream.close()
+
+    def compact_day(self, day, now = None):
+        """
+            Compact every closed hour partition of `day` and update its manifest.
+            Safe to re-run : compact partitions are skipped, late micro-batch files are folded in
+            param
+                day : yyyymmdd
+                now : current KST datetime (naive), default now in KST
+        """
+        now = now or datetime.now(KST).replace(tzinfo=None)
+        values = self._closed_partitions(day, now)
+        manifest = self.read_manifest(day)
+
+        compacted = 0
+        try:
+            for value in values:
+                entry = self.compact_partition(value)
+                if entry is not None:
+                    manifest[entry["partition"]] = entry
+                    compacted += 1
+        finally:
+            # Partitions swapped before a failure are still recorded
+            if compacted:
+                self._write_manifest(day, manifest)
+        self.log.info(f"{self.dataset} {day}: {compacted}/{len(values)} closed partitions compacted")
+        return compacted
@@ -1,15 +1,18 @@
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import (
-    col, split, from_json, regexp_replace, 
+    col, split, from_json, 
     when, lit, to_timestamp, date_format, 
     explode, min, max, avg, struct,
     collect_list, expr, row_number,
     substring, concat_ws, coalesce, to_json,
-    trim, first, max as spark_max, to_date,
+    trim, max as spark_max, to_date,
+    concat,
 )
 from pyspark.sql.window import Window
+from pyspark import StorageLevel
 import json
-import redis
+import time
+import hashlib
 import logging
 
 from pyspark.sql.types import (
@@ -18,6 +21,144 @@ from pyspark.sql.types import (
 )
 import os
 
+from spark.utils.redis_writer import RedisBatchWriter, partition_writer
+from spark.utils.streaming_metrics import record_sink
+
+
+# KMA hourly raw_line : name -> (index in the whitespace split, type, value for KMA_MISSING_VALUES)
+KMA_RAW_FIELDS = {
+    "ws": (3, "double", 0),         # 풍속
+    "ta": (11, "double", None),     # 기온
+    "hm": (13, "double", None),     # 상대습도
+    "rn": (15, "double", 0),        # 강수량
+    "sd_tot": (21, "double", 0),    # 신적설
+    "wc": (22, "int", None),        # GT 현재일기
+    "ca_tot": (25, "int", None),    # 하늘상태
+}
+KMA_MISSING_VALUES = (-9, -99)
+
+# Forecasts of a base time arrive within one 30 min DAG run
+FORECAST_WATERMARK = "2 hours"
+# Air forecasts are published 4 times a day (air_forecast_dag, 5,11,17,23h)
+AIR_FORECAST_WATERMARK = "6 hours"
+
+
+# Pools of the FAIR scheduler, a query picks one through StreamConfig.pool
+FAIR_SCHEDULER_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conf", "fairscheduler.xml"
+)
+
+# Fields of the forecast value that change on every publish without changing the forecast
+FORECAST_VOLATILE_FIELDS = ("base_date", "base_time")
+
+
+# Row -> (key, value) builders for the Redis sinks
+# Kept at module level so they can also be shipped to executors
+def _str(value):
+    return str(value) if value is not None else ""
+
+
+def weather_record(row):
+    """
+        kma-stn:{stn_id} hash
+    """
+    return f"kma-stn:{row['stn_id']}", {
+        # 관측시간(obs_time), 기온(TA), 습도(hm), 현재일기(wc), 강수유무(pop), 하늘상태(sky)
+        'obs_time': row['obs_time'] or '',
+        'ta': _str(row['ta']),
+        'ws' : _str(row['ws']),
+        'hm': _str(row['hm']),
+        'wc': _str(row['wc']),
+        'pop': _str(row['pop']),
+        'sky': _str(row['sky']),
+        'longitude': _str(row['경도']),
+        'latitude': _str(row['위도']),
+        'location': _str(row['지역']),
+        # 음악 추천 결과
+        'music' : row['music_json'] or "",
+        'weather_code' : row['weather_code'] or "",
+        # 도서 추천 결과
+        "book_title": row["title"] or "",
+        "book_author": row["author"] or "",
+        "book_genre": row["categoryName"] or "",
+        "book_description": row["description"] or "",
+        "book_isbn13": row["ebook_isbn13"] or "",
+        "book_link": row["ebook_link"] or "",
+    }
+
+
+def air_realtime_record(row):
+    """
+        air-realtime:{station_code} hash
+    """
+    return f"air-realtime:{row['station_code']}", {
+        "station_code": _str(row["station_code"]),
+        "sido_name": row["sido_name"] or "",
+        "station_name": row["station_name"] or "",
+        "pm10": _str(row["pm10"]),
+        "pm25": _str(row["pm25"]),
+        "pm10_level": row["pm10_level"] or "",
+        "pm25_level": row["pm25_level"] or "",
+        "realtime_mask_required": row["realtime_mask_required"] or "",
+        "data_time": row["data_time"] or "",
+    }
+
+
+def air_forecast_record(row):
+    """
+        air-forecast:{region}:{inform_date} hash
+    """
+    return f"air-forecast:{row['region']}:{row['inform_date']}", {
+        "region": row["region"] or "",
+        "inform_date": _str(row["inform_date"]),
+        "data_time": _str(row["data_time"]),
+        "pm10_forecast_grade": row["pm10_forecast_grade"] or "",
+        "pm25_forecast_grade": row["pm25_forecast_grade"] or "",
+        "forecast_mask_required": row["forecast_mask_required"] or "",
+    }
+
+
+def air_summary_record(row):
+    """
+        air-summary:{station_code} hash
+    """
+    return f"air-summary:{row['station_code']}", {
+        "station_code": _str(row["station_code"]),
+        # 실시간
+        "sido_name": row["sido_name"] or "",
+        "pm10": _str(row["pm10"]),
+        "pm25": _str(row["pm25"]),
+        "pm10_level": row["pm10_level"] or "",
+        "pm25_level": row["pm25_level"] or "",
+        "realtime_mask_required": row["realtime_mask_required"] or "",
+
+        # 예보
+        "pm10_forecast_level": row["pm10_forecast_grade"] or "",
+        "pm25_forecast_level": row["pm25_forecast_grade"] or "",
+        "forecast_mask_required": row["forecast_mask_required"] or "",
+        "inform_date": _str(row["inform_date"]),
+
+        # 결합 추천
+        "mask_advice": row["mask_advice"] or "",
+        "data_time": row["data_time"] or "",
+    }
+
+
+def forecast_record(row):
+    """
+        forecast:{address} JSON string + its digest in forecast-digest:{address}
+        (outside the forecast:* pattern scanned by fastapi)
+        The digest leaves out the publish time, so a re-published identical forecast is not rewritten
+    """
+    data = row.asDict()
+    value = json.dumps(data, ensure_ascii=False)
+    content = {k: v for k, v in data.items() if k not in FORECAST_VOLATILE_FIELDS}
+    digest = hashlib.sha1(
+        json.dumps(content, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"forecast:{row['address']}", value, f"forecast-digest:{row['address']}", digest
+
+
 class Spark_utils:
     """
         Utils library for spark jobs
@@ -35,6 +176,11 @@ class Spark_utils:
 
         self.redis_host = os.getenv("REDIS_HOST")
         self.redis_port = int(os.getenv("REDIS_PORT"))
+        self.redis_writer = RedisBatchWriter(self.redis_host, self.redis_port)
+        # partition : executors write their own partitions, driver : collect() then write
+        self.redis_sink_mode = os.getenv("REDIS_SINK_MODE", "partition")
+        # 0 keeps the batch partitioning as is
+        self.redis_sink_partitions = int(os.getenv("REDIS_SINK_PARTITIONS", "0"))
         
 
     def get_spark(self, appName):
@@ -43,7 +189,7 @@ class Spark_utils:
             param 
                 appName : Name of spark session
         """
-        return (
+        builder = (
             SparkSession.builder
             .appName(appName)
             # General setup
@@ -58,39 +204,54 @@ class Spark_utils:
             .config("spark.hadoop.fs.s3a.path.style.access", "true")
             .config("fs.s3a.impl", "org.apache.hadoop.fs.s3a.S3AFileSystem")
             .config("spark.hadoop.fs.s3a.endpoint", "s3.amazonaws.com")
-            # Stream
-            .config("spark.streaming.stopGracefullyOnShutdown", "true")
-            .config("spark.streaming.backpressure.enabled", "true")
-            .config("spark.streaming.kafka.allowNonConsecutiveOffsets", "true")
-            .config("spark.streaming.kafka.consumer.poll.ms", "30000")
+            # Stream (rate limits and triggers are per query, see stream_config)
             .config("spark.sql.adaptive.enabled", "true")
             .config("spark.sql.shuffle.partitions", "4")
-            .config("spark.streaming.kafka.maxRatePerPartition", "800")
             .config("spark.sql.streaming.statefulOperator.checkCorrectness.enabled", "false")
+            # Queries share the executors by pool instead of FIFO
+            .config("spark.scheduler.mode", "FAIR")
+            .config("spark.scheduler.allocation.file", FAIR_SCHEDULER_FILE)
 
             # Redis
             .config("spark.redis.host", self.redis_host)
             .config("spark.redis.port", str(self.redis_port)) 
-            .getOrCreate()
         )
+
+        # State store : hdfs (default, JVM heap) | rocksdb (off-heap, native memory)
+        if os.getenv("SPARK_STATE_STORE", "hdfs").lower() == "rocksdb":
+            builder = (
+                builder
+                .config("spark.sql.streaming.stateStore.providerClass",
+                    "org.apache.spark.sql.execution.streaming.state.RocksDBStateStoreProvider")
+                .config("spark.sql.streaming.stateStore.rocksdb.changelogCheckpointing.enabled", "true")
+            )
+
+        return builder.getOrCreate()
     
-    def read_kafka_topic(self, spark_session, topic, offset='latest'):
+    def read_kafka_topic(self, spark_session, topic, offset='latest',
+                         max_offsets_per_trigger=None, min_partitions=None):
         """
             Read and load kafka topic 
             parmam
                 spark_session : Current Spark Session
                 topic : Kafka topic name
                 offset : Starting offset in topic
+                max_offsets_per_trigger : Max Kafka records per micro-batch, None for no limit
+                min_partitions : Min Spark partitions of the read, None for one per topic partition
         """
-        return(
+        reader = (
             spark_session.readStream
             .format("kafka")
             .option("kafka.bootstrap.servers", "kafka:9092")
             .option("subscribe", topic)
             .option("startingOffsets", offset)
             .option("failOnDataLoss", "false")
-            .load()
         )
+        if max_offsets_per_trigger:
+            reader = reader.option("maxOffsetsPerTrigger", str(max_offsets_per_trigger))
+        if min_partitions:
+            reader = reader.option("minPartitions", str(min_partitions))
+        return reader.load()
     
 
 
@@ -109,95 +270,66 @@ class Spark_utils:
             StructField("stn_id", StringType(), False),
         ])
 
-        # Cast value to String and set into column as data
-        df_json = (
+        # Cast value to String, split the raw_line once by whitespace
+        df_splited = (
             raw_data
             .selectExpr("CAST(value as STRING) as json_str")
             .select(
                 from_json(col("json_str"), schema).alias("data")
             )
-            .select("data.*")
-        )
-
-        # Split the raw_line by space and store in fields as list
-        df_splited = df_json.withColumn(
-            'fields',
-            split(regexp_replace(col("raw_line"), r"\s+", " "), " ")
-        )
-
-        # Extract meaningful columns from list and save as column
-        df_parsed = (
-            df_splited
-            .withColumn("ws", col('fields')[3].cast('double')) # 풍속
-            .withColumn("ta", col('fields')[11].cast('double')) # 기온
-            .withColumn("hm", col('fields')[13].cast('double')) # 상대습도
-            .withColumn("rn", col('fields')[15].cast('double')) # 강수량
-            .withColumn("sd_tot", col('fields')[21].cast('double')) # 신적설
-            .withColumn('wc', col('fields')[22].cast('int')) # GT 현재일기
-            .withColumn("ca_tot", col('fields')[25].cast('int')) # 하늘상태
+            .select(
+                "data.obs_time",
+                "data.stn_id",
+                split(trim(col("data.raw_line")), r"\s+").alias("fields"),
+            )
         )
 
-        # Imputation
-        def sanitize_num(c):
-            return when(col(c).isin(-9, -99), lit(0)).otherwise(col(c))
+        # Extract meaningful columns from list and impute abnormal data (KMA_RAW_FIELDS)
+        def parse_field(name, index, dtype, fill):
+            value = col("fields")[index].cast(dtype)
+            return when(value.isin(*KMA_MISSING_VALUES), lit(fill)).otherwise(value).alias(name)
 
-        df_clean = (
-            df_parsed
-            .withColumn("ws", sanitize_num("ws"))
-            .withColumn("rn", sanitize_num("rn"))
-            .withColumn("sd_tot", sanitize_num("sd_tot"))
-            .withColumn("ta", when(col("ta").isin(-9, -99), lit(None)).otherwise(col("ta")))
-            .withColumn("hm", when(col("hm").isin(-9, -99), lit(None)).otherwise(col("hm")))
-            .withColumn("ca_tot", when(col("ca_tot").isin(-9, -99), lit(None)).otherwise(col("ca_tot")))
-            .withColumn('wc', when(col('wc').isin(-9, -99), lit(None)).otherwise(col('wc')))
+        df_parsed = df_splited.select(
+            "obs_time", "stn_id",
+            *[parse_field(name, *spec) for name, spec in KMA_RAW_FIELDS.items()]
         )
 
         # Extra information
-        # Compute is pop : Is raining and sky : Condition of the sky
-        df_parsed = (
-            df_clean
-            .withColumn(
-                "pop",
-                when(col("rn") > 0, lit(1)).otherwise(lit(0))
-            ) # 강수 유무
-            .withColumn(
-                "sky",
-                when(col("ca_tot") == 0, lit(1))
-                .when(col("ca_tot").between(1, 2), lit(2))
-                .when(col("ca_tot").between(3, 5), lit(3))
-                .when(col("ca_tot").between(6, 7), lit(4))
-                .otherwise(lit(5))
-            ) # 하늘상태 (1-맑음; 2-구름조금; 3-부분적흐림; 4-대체로흐림; 5-흐림)
-        )
-
-        # determine season | time-category | weather-category | weather-code
-        df = df_parsed \
-            .withColumn("month", substring("obs_time", 5, 2).cast("int")) \
-            .withColumn("day", substring("obs_time", 7, 2).cast("int")) \
-            .withColumn("hour", substring("obs_time", 9, 2).cast("int"))
-
-        df = df.withColumn(
-            "season",
-            when(col("month").between(3, 5), "봄")
-            .when(col("month").between(6, 8), "여름")
-            .when(col("month").between(9, 11), "가을")
+        # pop : Is raining, sky : Condition of the sky
+        # season | time-category from obs_time (yyyyMMddHHmm)
+        month_ = substring("obs_time", 5, 2).cast("int")
+        hour_ = substring("obs_time", 9, 2).cast("int")
+
+        df = df_parsed.select(
+            "obs_time", "stn_id",
+            "ws", "hm", "rn", "sd_tot",
+            coalesce(col("ta"), lit(0.0)).alias("ta"),
+            coalesce(col("wc"), lit(-99)).alias("wc"),
+            # 강수 유무
+            when(col("rn") > 0, lit(1)).otherwise(lit(0)).alias("pop"),
+            # 하늘상태 (1-맑음; 2-구름조금; 3-부분적흐림; 4-대체로흐림; 5-흐림)
+            when(col("ca_tot") == 0, lit(1))
+            .when(col("ca_tot").between(1, 2), lit(2))
+            .when(col("ca_tot").between(3, 5), lit(3))
+            .when(col("ca_tot").between(6, 7), lit(4))
+            .otherwise(lit(5))
+            .alias("sky"),
+            month_.alias("month"),
+            substring("obs_time", 7, 2).cast("int").alias("day"),
+            when(month_.between(3, 5), "봄")
+            .when(month_.between(6, 8), "여름")
+            .when(month_.between(9, 11), "가을")
             .otherwise("겨울")
-        )
-
-        df = df.withColumn(
-            "time_category",
-            when(col("hour").between(0, 6), "새벽")
-            .when(col("hour").between(7, 11), "오전")
-            .when(col("hour").between(12, 17), "오후")
+            .alias("season"),
+            when(hour_.between(0, 6), "새벽")
+            .when(hour_.between(7, 11), "오전")
+            .when(hour_.between(12, 17), "오후")
             .otherwise("저녁")
+            .alias("time_category"),
         )
-        df = df \
-            .withColumn("wc", coalesce(col("wc"), lit(-99))) \
-            .withColumn("ta", coalesce(col("ta"), lit(0.0))) \
-            .withColumn("sky", coalesce(col("sky"), lit(0)))
 
-        df = df.withColumn(
-            "weather_category",
+        # determine weather-category
+        weather_category = (
             when(col("wc").between(70, 79), "눈")
             .when(col("wc").between(50, 99), "비")
             .when(
@@ -237,20 +369,16 @@ class Spark_utils:
             .otherwise("화창")
         )
 
-
         # Fix final DataFrame
-        return (
-            df
-            .withColumn("obs_ts", to_timestamp(col("obs_time"), "yyyyMMddHHmm"))
-            .withColumn("obs_yyyymmddhh", date_format(col("obs_ts"), "yyyyMMddHH"))
-            .withColumn('weather_code', concat_ws("-", "season", "time_category", "weather_category"))
-            .select(
-                "obs_time", "obs_ts", "obs_yyyymmddhh",
-                "stn_id",
-                "ws", "ta", "hm", "rn", "sd_tot",
-                "wc", "pop", "sky", "ws",
-                'weather_code'
-            )
+        obs_ts = to_timestamp(col("obs_time"), "yyyyMMddHHmm")
+        return df.select(
+            "obs_time",
+            obs_ts.alias("obs_ts"),
+            date_format(obs_ts, "yyyyMMddHH").alias("obs_yyyymmddhh"),
+            "stn_id",
+            "ws", "ta", "hm", "rn", "sd_tot",
+            "wc", "pop", "sky",
+            concat_ws("-", "season", "time_category", weather_category).alias("weather_code"),
         )
 
     def preprocessing_air_realtime(self, raw_data):
@@ -336,44 +464,41 @@ class Spark_utils:
         )
 
         # data_time 정규화 (예: "2025-12-31 23:00")
-        #df = df.withColumn("inform_date", to_date(col("inform_data"), "yyyy-MM-dd"))
+        # 발표 시각 기준 watermark -> 지난 발표의 집계 state는 제거
         df = df.withColumn("data_time_ts", to_timestamp(col("data_time"), "yyyy-MM-dd HH:mm"))
-        #df = df.withColumn("data_time_yyyymmddhh", date_format(col("data_time_ts"), "yyyyMMddHH"))
+        df = df.withWatermark("data_time_ts", AIR_FORECAST_WATERMARK)
 
-        # 2) 등급 점수화
-        df = df.withColumn(
-            "grade_score",
+        # 등급 점수화
+        grade_score = (
             when(col("grade") == "좋음", lit(1))
             .when(col("grade") == "보통", lit(2))
             .when(col("grade") == "나쁨", lit(3))
             .when(col("grade") == "매우나쁨", lit(4))
-            .otherwise(lit(None))
         )
 
-        # 3) 최악값 집계 (region + 날짜 + 발표시각 + PM코드 기준)
-        df = (
-            df.groupBy("region", "inform_data", "data_time_ts", "inform_code")
-            .agg(spark_max("grade_score").alias("grade_score"))
-        )
-
-        # 4) 점수 -> 등급 복원
-        df = df.withColumn(
-            "grade",
-            when(col("grade_score") == 1, lit("좋음"))
-            .when(col("grade_score") == 2, lit("보통"))
-            .when(col("grade_score") == 3, lit("나쁨"))
-            .when(col("grade_score") == 4, lit("매우나쁨"))
-            .otherwise(lit(None))
-        )
-
-        # PM10/PM25를 컬럼으로 펴서 조인 편하게
+        # 최악값 집계 1회 (region + 날짜 + 발표시각 기준, PM10/PM25 컬럼으로 바로 집계)
         df = (
             df.groupBy("region", "inform_data", "data_time_ts")
             .agg(
-                first(when(col("inform_code") == "PM10", col("grade")), True).alias("pm10_forecast_grade"),
-                first(when(col("inform_code") == "PM25", col("grade")), True).alias("pm25_forecast_grade"),
+                spark_max(when(col("inform_code") == "PM10", grade_score)).alias("pm10_score"),
+                spark_max(when(col("inform_code") == "PM25", grade_score)).alias("pm25_score"),
             )
         )
+
+        # 점수 -> 등급 복원
+        def score_to_grade(c):
+            return (
+                when(col(c) == 1, lit("좋음"))
+                .when(col(c) == 2, lit("보통"))
+                .when(col(c) == 3, lit("나쁨"))
+                .when(col(c) == 4, lit("매우나쁨"))
+            )
+
+        df = df.select(
+            "region", "inform_data", "data_time_ts",
+            score_to_grade("pm10_score").alias("pm10_forecast_grade"),
+            score_to_grade("pm25_score").alias("pm25_forecast_grade"),
+        )
         df = df.withColumn("data_time_yyyymmddhh", date_format(col("data_time_ts"), "yyyyMMddHH"))
         #df = df.withColumn("data_time", date_format(col("data_time_ts"), "yyyy-MM-dd HH:mm"))
         df = df.withColumn("inform_date", to_date(col("inform_data"), "yyyy-MM-dd"))
@@ -390,15 +515,33 @@ class Spark_utils:
 
         return df
 
+    def fan_out(self, *sinks):
+        """
+            Build a foreachBatch function running every sink on one materialization.
+            The batch is persisted once, so the source and upstream joins are
+            evaluated a single time per trigger whatever the number of sinks
+            param
+                sinks : foreachBatch functions (batch_df, batch_id)
+        """
+        def write_batch(batch_df, batch_id):
+            batch_df.persist(StorageLevel.MEMORY_AND_DISK)
+            try:
+                for sink in sinks:
+                    sink(batch_df, batch_id)
+            finally:
+                batch_df.unpersist()
+
+        return write_batch
+
     def save_batch_to_s3(self, batch_df, batch_id):
         """
             Save spark dataframe as parquet in s3 folder
         """
         try:
-            count = batch_df.count()
             s3_path = f"s3a://{self.bucket}/kma-weather/hourly-data"
+            started = time.perf_counter()
             
-            self.log.info(f"Batch {batch_id}: Writing {count} records to S3...")
+            self.log.info(f"Batch {batch_id}: Writing records to S3...")
             
             (
                 batch_df
@@ -408,9 +551,11 @@ class Spark_utils:
                 .parquet(s3_path)
             )
             
-            self.log.info(f"Batch {batch_id}: Successfully saved {count} records to S3 - {s3_path}")
+            record_sink("s3", "kma-weather", (time.perf_counter() - started) * 1000)
+            self.log.info(f"Batch {batch_id}: Successfully saved records to S3 - {s3_path}")
             
         except Exception as e:
+            record_sink("s3", "kma-weather", 0.0, errors=1)
             self.log.error(f"Batch {batch_id}: S3 write error: {e}")
             raise
 
@@ -419,10 +564,10 @@ class Spark_utils:
             Save spark dataframe as parquet in s3 folder
         """
         try:
-            count = batch_df.count()
             s3_path = f"s3a://{self.bucket}/air-realtime/hourly-data"
+            started = time.perf_counter()
             
-            self.log.info(f"Batch {batch_id}: Writing {count} records to S3...")
+            self.log.info(f"Batch {batch_id}: Writing records to S3...")
             
             (
                 batch_df
@@ -432,236 +577,114 @@ class Spark_utils:
                 .parquet(s3_path)
             )
             
-            self.log.info(f"Batch {batch_id}: Successfully saved {count} records to S3 - {s3_path}")
+            record_sink("s3", "air-realtime", (time.perf_counter() - started) * 1000)
+            self.log.info(f"Batch {batch_id}: Successfully saved records to S3 - {s3_path}")
             
         except Exception as e:
+            record_sink("s3", "air-realtime", 0.0, errors=1)
             self.log.error(f"Batch {batch_id}: S3 write error: {e}")
             raise
 
     def save_batch_to_s3_air_forecast(self, batch_df, batch_id):
-        try:
-            if batch_df is None or batch_df.rdd.isEmpty():
-                self.log.info(f"Batch {batch_id}: Empty batch, skip S3 write")
-                return
-
-            s3_path = f"s3a://{self.bucket}/air-forecast/hourly-data"
-
-            (
-                batch_df
-                .write
-                .mode("overwrite")
-                .option("compression", "snappy")
-                .option("maxRecordsPerFile", 20000)
-                .partitionBy("data_time_yyyymmddhh")
-                .parquet(s3_path)
-            )
-
-            self.log.info(f"Batch {batch_id}: Successfully saved records to S3 - {s3_path}")
-
-        except Exception as e:
-            self.log.error(f"Batch {batch_id}: S3 write error: {e}")
-            raise
-
-    def save_batch_to_redis(self, batch_df, batch_id):
-        try:
-            rows = batch_df.collect()
-
-            if not rows:
-                self.log.info(f'Batch {batch_id}: No data to write to Redis')
-                return
-            
-            r = redis.Redis(
-                host=self.redis_host,
-                port=self.redis_port,
-                decode_responses=True
-            )
-            for row in rows:
-                try:
-                    weather_data = {
-                        # 관측시간(obs_time), 기온(TA), 습도(hm), 현재일기(wc), 강수유무(pop), 하늘상태(sky)
-                        'obs_time': row['obs_time'] or '',
-                        'ta': str(row['ta']) if row['ta'] is not None else '',
-                        'ws' : str(row['ws']) if row['ws'] is not None else '',
-                        'hm': str(row['hm']) if row['hm'] is not None else '',
-                        'wc': str(row['wc']) if row['wc'] is not None else '',
-                        'pop': str(row['pop']) if row['pop'] is not None else '',
-                        'sky': str(row['sky']) if row['sky'] is not None else '',
-                        'longitude': str(row['경도']) if row['경도'] is not None else '',
-                        'latitude': str(row['위도']) if row['위도'] is not None else '',
-                        'location': str(row['지역']) if row['지역'] is not None else '',
-                        # 음악 추천 결과
-                        'music' : row['music_json'] or "",
-                        'weather_code' : row['weather_code'] or "",
-                        # 도서 추천 결과
-                        "book_title": row["title"] or "",
-                        "book_author": row["author"] or "",
-                        "book_genre": row["categoryName"] or "",
-                        "book_description": row["description"] or "",
-                        "book_isbn13": row["ebook_isbn13"] or "",
-                        "book_link": row["ebook_link"] or "",
-                    }
-
-                    # Store in Redis as key : kma-stn:stn_id
-                    key = f"kma-stn:{row['stn_id']}"
-                    r.hset(key, mapping=weather_data)
-                    
-                    # TTL 24 hours
-                    r.expire(key, 86400)
-                    
-                    self.log.info(f"Batch {batch_id}: Saved to Redis - {key}")
-                    
-                except Exception as row_error:
-                    self.log.error(f"Batch {batch_id}: Error saving row to Redis: {row_error}")
-                    logging.error()
-                    continue
-            
-            self.log.info(f"Batch {batch_id}: Successfully saved {len(rows)} records to Redis")
-            
-        except Exception as e:
-            self.log.error(f"Batch {batch_id}: Redis batch write error: {e}")
-            raise
+        """
+            Upsert the updated air forecasts into their data_time_yyyymmddhh partitions
+        """
+        self._upsert_partitions_to_s3(
+            batch_df, batch_id,
+            f"s3a://{self.bucket}/air-forecast/hourly-data",
+            partition_cols=["data_time_yyyymmddhh"],
+            keys=["region", "inform_data", "data_time_ts"],
+        )
 
-    def save_batch_to_redis_air_realtime(self, batch_df, batch_id):
+    def _save_batch_records(self, batch_df, batch_id, label, to_record, kind = "hash"):
+        """
+            Write the batch to Redis through pipelined round trips
+            Return the write stats (rows, errors, round_trips, changed, elapsed_ms)
+            param
+                batch_df : micro-batch dataframe
+                batch_id : micro-batch id
+                label : data name used in logs
+                to_record : module level function row -> record of `kind`
+                kind : hash | string | string_if_changed (see RedisBatchWriter.write)
+        """
         try:
-            rows = batch_df.collect()
+            if self.redis_sink_mode == "partition":
+                stats = self._write_partitions_to_redis(batch_df, to_record, kind)
+            else:
+                stats = self._write_driver_to_redis(batch_df, batch_id, label, to_record, kind)
 
-            if not rows:
-                self.log.info(f"Batch {batch_id}: No air-quality data to write to Redis")
-                return
-
-            r = redis.Redis(
-                host=self.redis_host,
-                port=self.redis_port,
-                decode_responses=True
-            )
+            record_sink("redis", label, stats["elapsed_ms"], stats["rows"], stats["errors"])
 
-            for row in rows:
-                try:
-                    key = f"air-realtime:{row['station_code']}"
-
-                    air_data = {
-                        "station_code": str(row["station_code"]) if row["station_code"] is not None else "",
-                        "sido_name": row["sido_name"] or "",
-                        "station_name": row["station_name"] or "",
-                        "pm10": str(row["pm10"]) if row["pm10"] is not None else "",
-                        "pm25": str(row["pm25"]) if row["pm25"] is not None else "",
-                        "pm10_level": row["pm10_level"] or "",
-                        "pm25_level": row["pm25_level"] or "",
-                        "realtime_mask_required": row["realtime_mask_required"] or "",
-                        "data_time": row["data_time"] or "",
-                    }
-
-                    r.hset(key, mapping=air_data)
-                    r.expire(key, 86400)
-
-                    self.log.info(f"Batch {batch_id}: Saved air-quality to Redis - {key}")
-
-                except Exception as row_error:
-                    self.log.error(
-                        f"Batch {batch_id}: Error saving air-quality row to Redis: {row_error}"
-                    )
-                    continue
+            if not stats["rows"]:
+                self.log.info(f"Batch {batch_id}: No {label} data to write to Redis")
+                return stats
 
             self.log.info(
-                f"Batch {batch_id}: Successfully saved {len(rows)} air-quality records to Redis"
+                f"Batch {batch_id}: Saved {stats['changed']}/{stats['rows']} {label} records to Redis "
+                f"in {stats['round_trips']} round trips ({stats['elapsed_ms']:.1f} ms, {stats['errors']} errors)"
             )
+            return stats
 
         except Exception as e:
-            self.log.error(f"Batch {batch_id}: Redis air-quality batch write error: {e}")
+            record_sink("redis", label, 0.0, errors=1)
+            self.log.error(f"Batch {batch_id}: Redis {label} batch write error: {e}")
             raise
 
-    def save_batch_to_redis_air_forecast(self, batch_df, batch_id):
-        try:
-            rows = batch_df.collect()
-            if not rows:
-                self.log.info(f"Batch {batch_id}: No air-forecast data to write to Redis")
-                return
-
-            r = redis.Redis(
-                host=self.redis_host,
-                port=self.redis_port,
-                decode_responses=True
-            )
+    def _write_driver_to_redis(self, batch_df, batch_id, label, to_record, kind):
+        """
+            Collect the batch to the driver and write it with the shared writer
+        """
+        rows = batch_df.collect()
 
+        def records():
             for row in rows:
                 try:
-                    key = f"air-forecast:{row['region']}:{row['inform_date']}"
+                    yield to_record(row)
+                except (KeyError, ValueError, TypeError) as row_error:
+                    self.log.error(f"Batch {batch_id}: Error building {label} row for Redis: {row_error}")
 
-                    data = {
-                        "region": row["region"] or "",
-                        "inform_date": str(row["inform_date"]) if row["inform_date"] is not None else "",
-                        "data_time": str(row["data_time"]) if row["data_time"] is not None else "",
-                        "pm10_forecast_grade": row["pm10_forecast_grade"] or "",
-                        "pm25_forecast_grade": row["pm25_forecast_grade"] or "",
-                        "forecast_mask_required": row["forecast_mask_required"] or "",
-                    }
+        return self.redis_writer.write(kind, records())
 
-                    r.hset(key, mapping=data)
-                    r.expire(key, 86400)
+    def _write_partitions_to_redis(self, batch_df, to_record, kind):
+        """
+            Let each executor write its partitions with its own pooled connection,
+            only the per-partition counts come back to the driver
+        """
+        started = time.perf_counter()
+
+        df = batch_df
+        if self.redis_sink_partitions > 0:
+            df = df.repartition(self.redis_sink_partitions)
+
+        write_partition = partition_writer(
+            self.redis_host,
+            self.redis_port,
+            to_record,
+            kind=kind,
+            chunk_size=self.redis_writer.chunk_size,
+            ttl=self.redis_writer.ttl,
+        )
+        counts = df.rdd.mapPartitions(write_partition).collect()
 
-                    self.log.info(f"Batch {batch_id}: Saved air-forecast to Redis - {key}")
+        return {
+            "rows": sum(c[0] for c in counts),
+            "errors": sum(c[1] for c in counts),
+            "round_trips": sum(c[2] for c in counts),
+            "changed": sum(c[3] for c in counts),
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
 
-                except Exception as row_error:
-                    self.log.error(f"Batch {batch_id}: Error saving air-forecast row: {row_error}")
-                    continue
+    def save_batch_to_redis(self, batch_df, batch_id):
+        return self._save_batch_records(batch_df, batch_id, "weather", weather_record)
 
-            self.log.info(f"Batch {batch_id}: Saved {len(rows)} air-forecast records")
+    def save_batch_to_redis_air_realtime(self, batch_df, batch_id):
+        return self._save_batch_records(batch_df, batch_id, "air-quality", air_realtime_record)
 
-        except Exception as e:
-            self.log.error(f"Batch {batch_id}: Redis air-forecast batch write error: {e}")
-            raise
+    def save_batch_to_redis_air_forecast(self, batch_df, batch_id):
+        return self._save_batch_records(batch_df, batch_id, "air-forecast", air_forecast_record)
 
     def save_batch_to_redis_air_summary(self, batch_df, batch_id):
-        try:
-            rows = batch_df.collect()
-            if not rows:
-                self.log.info(f"Batch {batch_id}: No air-summary data to write to Redis")
-                return
-
-            r = redis.Redis(
-                host=self.redis_host,
-                port=self.redis_port,
-                decode_responses=True
-            )
-
-            for row in rows:
-                try:
-                    key = f"air-summary:{row['station_code']}"
-                    data = {
-                        "station_code": str(row["station_code"]) if row["station_code"] is not None else "",
-                        # 실시간
-                        "sido_name": row["sido_name"] or "",
-                        "pm10": str(row["pm10"]) if row["pm10"] is not None else "",
-                        "pm25": str(row["pm25"]) if row["pm25"] is not None else "",
-                        "pm10_level": row["pm10_level"] or "",
-                        "pm25_level": row["pm25_level"] or "",
-                        "realtime_mask_required": row["realtime_mask_required"] or "",
-
-                        # 예보
-                        "pm10_forecast_level": row["pm10_forecast_grade"] or "",
-                        "pm25_forecast_level": row["pm25_forecast_grade"] or "",
-                        "forecast_mask_required": row["forecast_mask_required"] or "",
-                        "inform_date": str(row["inform_date"]) if row["inform_date"] is not None else "",
-
-                        # 결합 추천
-                        "mask_advice": row["mask_advice"] or "",
-                        "data_time": row["data_time"] or "",
-                    }
-
-                    r.hset(key, mapping=data)
-                    r.expire(key, 86400)
-
-                    self.log.info(f"Batch {batch_id}: Saved air-summary to Redis - {key}")
-
-                except Exception as row_error:
-                    self.log.error(f"Batch {batch_id}: Error saving air-summary row: {row_error}")
-                    continue
-
-            self.log.info(f"Batch {batch_id}: Saved {len(rows)} air-summary records")
-
-        except Exception as e:
-            self.log.error(f"Batch {batch_id}: Redis air-summary batch write error: {e}")
-            raise
+        return self._save_batch_records(batch_df, batch_id, "air-summary", air_summary_record)
 
     def weather_to_class(self, session, file_path, weather_df):
         weather_df.createOrReplaceTempView("weather_df")
@@ -714,11 +737,15 @@ class Spark_utils:
             .select(from_json(col('json'), schema).alias('data'), col('timestamp'))
             .select(
                 col('data.raw_json'),
+                col('data.raw_json.response.body.items.item')[0]['baseDate'].alias('base_date'),
                 col('data.base_time'),
                 col('data.coord_id'),
                 col('data.addresses'),
                 col('timestamp')
             )
+            # 발표 시각(baseDate + baseTime) 기준 watermark -> 지난 발표의 state는 제거
+            .withColumn('base_ts', to_timestamp(concat(col('base_date'), col('base_time')), 'yyyyMMddHHmm'))
+            .withWatermark('base_ts', FORECAST_WATERMARK)
         )
 
         # Explode to create each column : address and raw_json
@@ -728,7 +755,9 @@ class Spark_utils:
             .withColumn('item', explode(col("raw_json.response.body.items.item")))
             .select(
                 col("address"),
+                col('base_date'),
                 col('base_time'),
+                col('base_ts'),
                 col("item.fcstTime").alias("fcst_time"),
                 col("item.category").alias("category"),
                 col("item.fcstValue").alias("fcst_value"),
@@ -784,7 +813,7 @@ class Spark_utils:
         """
         result = (
             df_num
-            .groupBy("address", "base_time")
+            .groupBy("address", "base_date", "base_time", "base_ts")
             .agg(
                 # Is raining
                 (max("PTY_val") > 0).alias("is_raining"),
@@ -888,71 +917,93 @@ class Spark_utils:
 
         )
 
-        return result
+        # base_ts is only the watermark key, Redis/S3 keep base_date + base_time
+        return result.drop("base_ts")
     
 
     def save_batch_to_redis_forecast(self, batch_df, batch_id):
-        try:
-            rows = batch_df.collect()
-
-            if not rows:
-                self.log.info(f'Batch {batch_id}: No data to write to Redis')
-                return
-            
-            r = redis.Redis(
-                host=self.redis_host,
-                port=self.redis_port,
-                decode_responses=True
-            )
-            for row in rows:
-                try:
-                    # Store in Redis as key : forecast:address
-                    key = f"forecast:{row['address']}"
-                    value = json.dumps(row.asDict(), ensure_ascii=False)
-                    r.set(key, value)
-                    
-                    # TTL 24 hours
-                    r.expire(key, 86400)
-                    
-                    self.log.info(f"Batch {batch_id}: Saved to Redis - {key}")
-                    
-                except Exception as row_error:
-                    self.log.error(f"Batch {batch_id}: Error saving row to Redis: {row_error}")
-                    continue
-            
-            self.log.info(f"Batch {batch_id}: Successfully saved {len(rows)} records to Redis")
-            
-        except Exception as e:
-            self.log.error(f"Batch {batch_id}: Redis batch write error: {e}")
-            raise
+        return self._save_batch_records(batch_df, batch_id, "forecast", forecast_record, kind="string_if_changed")
 
     def save_batch_to_s3_forecast(self, batch_df, batch_id):
         """
-            Save spark dataframe as parquet in s3 folder
+            Upsert the updated forecasts into their (base_date, base_time) partitions
+        """
+        self._upsert_partitions_to_s3(
+            batch_df, batch_id,
+            f"s3a://{self.bucket}/weather-forecast/data",
+            partition_cols=["base_date", "base_time"],
+            keys=["address"],
+        )
+
+    def _upsert_partitions_to_s3(self, batch_df, batch_id, s3_path, partition_cols, keys):
         """
+            Upsert an update-mode batch into a partitioned parquet table.
+            Only the partitions touched by the batch are read, merged and
+            rewritten (dynamic partition overwrite), the rest of the table is untouched
+            param
+                batch_df : micro-batch dataframe
+                batch_id : micro-batch id
+                s3_path : s3a path of the table
+                partition_cols : partition columns of the table
+                keys : row keys inside a partition, batch rows replace stored rows with the same keys
+        """
+        target = s3_path.split(f"s3a://{self.bucket}/", 1)[-1]
+        started = time.perf_counter()
         try:
-            if batch_df is None or batch_df.rdd.isEmpty():
+            touched = batch_df.select(partition_cols).distinct().collect()
+            if not touched:
                 self.log.info(f"Batch {batch_id}: Empty batch, skip S3 write")
                 return
-            
-            s3_path = f"s3a://{self.bucket}/weather-forecast/hourly-data"
-            
-            self.log.info(f"Batch {batch_id}: Writing records to S3...")
-            
+
+            spark = batch_df.sparkSession
+            jvm = spark._jvm
+            fs = jvm.org.apache.hadoop.fs.FileSystem.get(
+                jvm.java.net.URI(s3_path), spark._jsc.hadoopConfiguration()
+            )
+            existing_paths = [
+                path for path in (
+                    s3_path + "".join(f"/{c}={row[c]}" for c in partition_cols)
+                    for row in touched
+                )
+                if fs.exists(jvm.org.apache.hadoop.fs.Path(path))
+            ]
+
+            merged = batch_df
+            if existing_paths:
+                # Explicit schema keeps partition values as strings ("0630" is not inferred as 630)
+                existing = (
+                    spark.read
+                    .schema(batch_df.schema)
+                    .option("basePath", s3_path)
+                    .parquet(*existing_paths)
+                )
+                merge_keys = keys + partition_cols
+                merged = (
+                    existing
+                    .join(batch_df.select(merge_keys), on=merge_keys, how="left_anti")
+                    .unionByName(batch_df)
+                )
+                # Cut the lineage to the files about to be overwritten
+                merged = merged.localCheckpoint()
+
+            self.log.info(f"Batch {batch_id}: Writing {len(touched)} partitions to S3...")
+
             (
-                batch_df
+                merged
                 .write
                 .mode("overwrite")
+                .option("partitionOverwriteMode", "dynamic")
                 .option("compression", "snappy")
                 .option("maxRecordsPerFile", 20000)
-                .partitionBy("base_time")
+                .partitionBy(*partition_cols)
                 .parquet(s3_path)
-
             )
             
+            record_sink("s3", target, (time.perf_counter() - started) * 1000)
             self.log.info(f"Batch {batch_id}: Successfully saved records to S3 - {s3_path}")
             
         except Exception as e:
+            record_sink("s3", target, (time.perf_counter() - started) * 1000, errors=1)
             self.log.error(f"Batch {batch_id}: S3 write error: {e}")
             raise
 
@@ -0,0 +1,103 @@
+import logging
+import os
+import time
+
+from py4j.protocol import Py4JError
+from pyspark.sql.types import (
+    DoubleType,
+    IntegerType,
+    StringType,
+    StructField,
+    StructType,
+)
+
+# stn-metadata/metadata.csv written by fetch_STN_metadata_dag
+STN_METADATA_SCHEMA = StructType([
+    StructField("stn_id", IntegerType()),
+    StructField("경도", DoubleType()),
+    StructField("위도", DoubleType()),
+    StructField("STN_SP", IntegerType()),
+    StructField("지역", StringType()),
+])
+
+
+class StationMetadata:
+    """
+        Driver-side copy of the KMA station metadata for a broadcast join.
+        The csv is read with an explicit schema and collected once, then re-read
+        only when the S3 object's ETag changes (checked at most once per `check_interval_min`)
+    """
+
+    def __init__(self, spark, path, check_interval_min = None):
+        """
+            param
+                spark : Spark session
+                path : s3a path of stn-metadata/metadata.csv
+                check_interval_min : Minutes between ETag checks (STN_METADATA_CHECK_MIN, default 60)
+        """
+        self.spark = spark
+        self.path = path
+        self.check_interval = 60 * float(
+            check_interval_min if check_interval_min is not None
+            else os.getenv("STN_METADATA_CHECK_MIN", "60")
+        )
+        self.log = logging.getLogger("station-metadata")
+
+        self.df = None
+        self.etag = None
+        self.checked_at = None
+
+    def _current_etag(self):
+        """
+            ETag of the csv object, (modification time, length) when the filesystem has none
+        """
+        jvm = self.spark._jvm
+        conf = self.spark._jsc.hadoopConfiguration()
+        fs = jvm.org.apache.hadoop.fs.FileSystem.get(jvm.java.net.URI(self.path), conf)
+        status = fs.getFileStatus(jvm.org.apache.hadoop.fs.Path(self.path))
+
+        try:
+            etag = status.getEtag()
+            if etag:
+                return etag
+        except Py4JError as e:
+            # FileStatus without EtagSource (hadoop < 3.3.5 or a non-S3 filesystem)
+            self.log.debug(f"No ETag on {self.path}: {e}")
+        return f"{status.getModificationTime()}-{status.getLen()}"
+
+    def _load(self):
+        """
+            Read the csv with the explicit schema (no inference pass) and keep it as local rows
+        """
+        rows = (
+            self.spark.read
+            .schema(STN_METADATA_SCHEMA)
+            .option("header", True)
+            .csv(self.path)
+            .collect()
+        )
+        return self.spark.createDataFrame(rows, STN_METADATA_SCHEMA)
+
+    def get(self):
+        """
+            Return the metadata dataframe, reloading it if the ETag changed
+        """
+        now = time.monotonic()
+        if self.df is not None and now - self.checked_at < self.check_interval:
+            return self.df
+        self.checked_at = now
+
+        try:
+            etag = self._current_etag()
+        except Py4JError as e:
+            if self.df is not None:
+                self.log.warning(f"Station metadata ETag check failed, keep current copy: {e}")
+                return self.df
+            etag = None
+
+        if self.df is None or etag != self.etag:
+            self.df = self._load()
+            self.etag = etag
+            self.log.info(f"Loaded station metadata from {self.path} (etag {etag})")
+
+        return self.df
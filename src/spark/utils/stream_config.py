@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+
+# Per query defaults, overridden by the json file in SPARK_STREAM_CONFIG then by env
+#   trigger : processing time ("1 minute"), "available_now", or None (as fast as possible)
+#   max_offsets_per_trigger : Kafka records per micro-batch, None for no limit
+#   min_partitions : Spark partitions for the Kafka read, None for one per topic partition
+#   pool : FAIR scheduler pool of the query's jobs (spark/conf/fairscheduler.xml)
+DEFAULT_STREAM_CONFIG = {
+    "weather": {"trigger": "1 minute", "max_offsets_per_trigger": 5000, "min_partitions": None, "pool": "serving"},
+    "forecast": {"trigger": "1 minute", "max_offsets_per_trigger": 2000, "min_partitions": None, "pool": "serving"},
+    "air_realtime": {"trigger": "1 minute", "max_offsets_per_trigger": 2000, "min_partitions": None, "pool": "archive"},
+    "air_forecast": {"trigger": "5 minutes", "max_offsets_per_trigger": None, "min_partitions": None, "pool": "archive"},
+    "air_forecast_state": {"trigger": "1 minute", "max_offsets_per_trigger": None, "min_partitions": None, "pool": "latency"},
+    "air_summary": {"trigger": "30 seconds", "max_offsets_per_trigger": 2000, "min_partitions": None, "pool": "latency"},
+}
+
+AVAILABLE_NOW = "available_now"
+
+
+def _load_file():
+    path = os.getenv("SPARK_STREAM_CONFIG")
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _env_value(value):
+    if value.lower() in ("", "none", "null"):
+        return None
+    return int(value) if value.isdigit() else value
+
+
+class StreamConfig:
+    """
+        Trigger and Kafka read settings of one streaming query.
+        Env overrides : STREAM_<NAME>_TRIGGER, STREAM_<NAME>_MAX_OFFSETS, STREAM_<NAME>_MIN_PARTITIONS,
+                        STREAM_<NAME>_POOL
+    """
+
+    def __init__(self, name, trigger = None, max_offsets_per_trigger = None, min_partitions = None, pool = None):
+        self.name = name
+        self.trigger = trigger
+        self.max_offsets_per_trigger = max_offsets_per_trigger
+        self.min_partitions = min_partitions
+        self.pool = pool
+
+    @classmethod
+    def load(cls, name, trigger = None):
+        """
+            Build the config of query `name` from defaults, config file and env
+            param
+                name : query name (see DEFAULT_STREAM_CONFIG)
+                trigger : Trigger forced by the caller (e.g. AVAILABLE_NOW for batch runs)
+        """
+        conf = dict(DEFAULT_STREAM_CONFIG.get(name, {}))
+        conf.update(_load_file().get(name, {}))
+
+        prefix = f"STREAM_{name.upper()}_"
+        for env_key, conf_key in (
+            ("TRIGGER", "trigger"),
+            ("MAX_OFFSETS", "max_offsets_per_trigger"),
+            ("MIN_PARTITIONS", "min_partitions"),
+            ("POOL", "pool"),
+        ):
+            if os.getenv(prefix + env_key) is not None:
+                conf[conf_key] = _env_value(os.getenv(prefix + env_key))
+        if trigger is not None:
+            conf["trigger"] = trigger
+
+        config = cls(name, **conf)
+        logging.getLogger("stream-config").info(f"{name}: {config.__dict__}")
+        return config
+
+    def kafka_options(self):
+        """
+            Keyword arguments of Spark_utils.read_kafka_topic.
+            startingOffsets only applies to a new checkpoint : an availableNow run starts from
+            earliest, otherwise the first run would skip what the producer task just published
+        """
+        return {
+            "offset": "earliest" if self.trigger == AVAILABLE_NOW else "latest",
+            "max_offsets_per_trigger": self.max_offsets_per_trigger,
+            "min_partitions": self.min_partitions,
+        }
+
+    def pooled(self, func):
+        """
+            Wrap a foreachBatch function so the jobs of each micro-batch run in self.pool.
+            The local property is set on the query's micro-batch thread, other queries keep theirs
+            param
+                func : foreachBatch function (batch_df, batch_id)
+        """
+        pool = self.pool
+
+        def run_in_pool(batch_df, batch_id):
+            if pool:
+                batch_df.sparkSession.sparkContext.setLocalProperty("spark.scheduler.pool", pool)
+            return func(batch_df, batch_id)
+
+        return run_in_pool
+
+    def apply(self, writer):
+        """
+            Set query name and trigger on a DataStreamWriter
+            param
+                writer : df.writeStream
+        """
+        writer = writer.queryName(self.name)
+        if self.trigger == AVAILABLE_NOW:
+            return writer.trigger(availableNow=True)
+        if self.trigger:
+            return writer.trigger(processingTime=self.trigger)
+        return writer
@@ -0,0 +1,256 @@
+import logging
+import os
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from pyspark.sql.streaming import StreamingQueryListener
+
+# (metric name, help) of the per query gauges, filled by StreamingMetricsListener
+QUERY_GAUGES = (
+    ("spark_streaming_query_active", "1 while the query runs, 0 once terminated"),
+    ("spark_streaming_query_failed", "1 if the query terminated with an exception"),
+    ("spark_streaming_latest_batch_id", "Id of the last completed micro-batch"),
+    ("spark_streaming_input_rows", "Input rows of the last micro-batch"),
+    ("spark_streaming_input_rows_per_second", "Input rate of the last micro-batch"),
+    ("spark_streaming_processed_rows_per_second", "Processing rate of the last micro-batch"),
+    ("spark_streaming_batch_duration_ms", "Trigger execution time of the last micro-batch"),
+    ("spark_streaming_add_batch_duration_ms", "Sink (foreachBatch) time of the last micro-batch"),
+    ("spark_streaming_state_rows", "Rows kept in the state store"),
+    ("spark_streaming_state_memory_bytes", "Memory used by the state store"),
+)
+
+# (metric name, type, help) of the per sink metrics, filled by record_sink
+SINK_METRICS = (
+    ("spark_sink_last_duration_ms", "gauge", "Duration of the last write"),
+    ("spark_sink_duration_ms_total", "counter", "Total write time"),
+    ("spark_sink_batches_total", "counter", "Micro-batches written"),
+    ("spark_sink_rows_total", "counter", "Rows written"),
+    ("spark_sink_errors_total", "counter", "Failed writes (rows or batches)"),
+)
+
+
+class MetricsRegistry:
+    """
+        Thread-safe store of the latest streaming and sink metrics,
+        rendered in Prometheus text format
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}   # query name -> {metric: value}
+        self.sinks = {}     # (sink, target) -> {metric: value}
+
+    def set_query(self, name, **values):
+        with self.lock:
+            self.queries.setdefault(name, {}).update(values)
+
+    def record_sink(self, sink, target, elapsed_ms, rows = 0, errors = 0):
+        """
+            param
+                sink : redis | s3
+                target : data name or path written
+                elapsed_ms : duration of the write
+                rows : rows written, 0 when unknown
+                errors : failed rows or batches
+        """
+        with self.lock:
+            m = self.sinks.setdefault((sink, target), {
+                "spark_sink_last_duration_ms": 0.0,
+                "spark_sink_duration_ms_total": 0.0,
+                "spark_sink_batches_total": 0,
+                "spark_sink_rows_total": 0,
+                "spark_sink_errors_total": 0,
+            })
+            m["spark_sink_last_duration_ms"] = elapsed_ms
+            m["spark_sink_duration_ms_total"] += elapsed_ms
+            m["spark_sink_batches_total"] += 1
+            m["spark_sink_rows_total"] += rows
+            m["spark_sink_errors_total"] += errors
+
+    def snapshot(self):
+        """
+            Plain dict copy of every metric, for a structured log line
+        """
+        with self.lock:
+            return {
+                "queries": {name: dict(values) for name, values in self.queries.items()},
+                "sinks": {f"{sink}:{target}": dict(values) for (sink, target), values in self.sinks.items()},
+            }
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric, help_text in QUERY_GAUGES:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} gauge")
+                for name, values in sorted(self.queries.items()):
+                    if values.get(metric) is not None:
+                        lines.append(f'{metric}{{query="{_escape(name)}"}} {values[metric]}')
+
+            for metric, metric_type, help_text in SINK_METRICS:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {metric_type}")
+                for (sink, target), values in sorted(self.sinks.items()):
+                    lines.append(
+                        f'{metric}{{sink="{_escape(sink)}",target="{_escape(target)}"}} {values[metric]}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# One registry per driver process, shared by the listener and Spark_utils sinks
+REGISTRY = MetricsRegistry()
+
+
+def record_sink(sink, target, elapsed_ms, rows = 0, errors = 0):
+    REGISTRY.record_sink(sink, target, elapsed_ms, rows, errors)
+
+
+def record_progress(name, progresses, registry = REGISTRY):
+    """
+        Copy the progress of a finished query into the registry and return a summary.
+        For availableNow runs, which end before a listener event can be relied on
+        param
+            name : query name
+            progresses : query.recentProgress (list of progress dicts)
+            registry : metrics registry
+    """
+    last = progresses[-1] if progresses else {}
+    duration = last.get("durationMs") or {}
+    state = last.get("stateOperators") or []
+
+    registry.set_query(
+        name,
+        spark_streaming_query_active=0,
+        spark_streaming_query_failed=0,
+        spark_streaming_latest_batch_id=last.get("batchId"),
+        spark_streaming_input_rows=last.get("numInputRows"),
+        spark_streaming_input_rows_per_second=last.get("inputRowsPerSecond"),
+        spark_streaming_processed_rows_per_second=last.get("processedRowsPerSecond"),
+        spark_streaming_batch_duration_ms=duration.get("triggerExecution"),
+        spark_streaming_add_batch_duration_ms=duration.get("addBatch"),
+        spark_streaming_state_rows=sum(s.get("numRowsTotal", 0) for s in state),
+        spark_streaming_state_memory_bytes=sum(s.get("memoryUsedBytes", 0) for s in state),
+    )
+    return {
+        "query": name,
+        "batches": len(progresses),
+        "input_rows": sum(p.get("numInputRows") or 0 for p in progresses),
+        "trigger_ms": sum((p.get("durationMs") or {}).get("triggerExecution", 0) for p in progresses),
+        "add_batch_ms": sum((p.get("durationMs") or {}).get("addBatch", 0) for p in progresses),
+        "last_batch_id": last.get("batchId"),
+    }
+
+
+def push_metrics(job, instance, registry = REGISTRY, url = None):
+    """
+        PUT the registry to a Prometheus Pushgateway, for short-lived apps nothing scrapes.
+        Return False when no gateway is configured or the push failed (the run itself succeeded)
+        param
+            job : pushgateway job label
+            instance : pushgateway instance label
+            registry : metrics registry to push
+            url : gateway base url (SPARK_METRICS_PUSHGATEWAY, e.g. http://pushgateway:9091)
+    """
+    url = url or os.getenv("SPARK_METRICS_PUSHGATEWAY")
+    if not url:
+        return False
+
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/metrics/job/{quote(job, safe='')}/instance/{quote(instance, safe='')}",
+        data=registry.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        method="PUT",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+    except OSError as e:
+        logging.getLogger("streaming-metrics").warning(f"Metrics push to {url} failed: {e}")
+        return False
+    return True
+
+
+class StreamingMetricsListener(StreamingQueryListener):
+    """
+        Copy every query progress into the registry, keyed by query name
+    """
+
+    def __init__(self, registry = REGISTRY):
+        self.registry = registry
+        self.names = {}     # query id -> name, terminated events only carry the id
+
+    def _name(self, query_id, name = None):
+        name = name or self.names.get(str(query_id)) or str(query_id)
+        self.names[str(query_id)] = name
+        return name
+
+    def onQueryStarted(self, event):
+        name = self._name(event.id, event.name)
+        self.registry.set_query(name, spark_streaming_query_active=1, spark_streaming_query_failed=0)
+
+    def onQueryProgress(self, event):
+        p = event.progress
+        duration = p.durationMs or {}
+        state = p.stateOperators or []
+
+        self.registry.set_query(
+            self._name(p.id, p.name),
+            spark_streaming_latest_batch_id=p.batchId,
+            spark_streaming_input_rows=p.numInputRows,
+            spark_streaming_input_rows_per_second=p.inputRowsPerSecond,
+            spark_streaming_processed_rows_per_second=p.processedRowsPerSecond,
+            spark_streaming_batch_duration_ms=duration.get("triggerExecution"),
+            spark_streaming_add_batch_duration_ms=duration.get("addBatch"),
+            spark_streaming_state_rows=sum(s.numRowsTotal for s in state),
+            spark_streaming_state_memory_bytes=sum(s.memoryUsedBytes for s in state),
+        )
+
+    def onQueryIdle(self, event):
+        pass
+
+    def onQueryTerminated(self, event):
+        self.registry.set_query(
+            self._name(event.id),
+            spark_streaming_query_active=0,
+            spark_streaming_query_failed=1 if event.exception else 0,
+        )
+
+
+def start_metrics_exporter(spark, port = None, registry = REGISTRY):
+    """
+        Register the listener and serve /metrics on a daemon thread
+        param
+            spark : Spark session
+            port : HTTP port (SPARK_METRICS_PORT, default 9108)
+            registry : metrics registry to expose
+    """
+    port = int(port if port is not None else os.getenv("SPARK_METRICS_PORT", "9108"))
+    spark.streams.addListener(StreamingMetricsListener(registry))
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep scrapes out of the job log
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logging.getLogger("streaming-metrics").info(f"Serving streaming metrics on :{port}/metrics")
+    return server
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from route_kafka.utils.commute_timeline import CommuteTimeline
+
+KST = ZoneInfo("Asia/Seoul")
+NOW = datetime(2026, 1, 5, 7, 0, tzinfo=KST)
+ARRIVE_BY = NOW + timedelta(hours=2)
+
+
+def _user(user_id=1, arrive_by=ARRIVE_BY, home_lat=37.5):
+    return {
+        "user_id": user_id,
+        "arrive_by": arrive_by,
+        "home_lon": 127.0,
+        "home_lat": home_lat,
+        "work_lon": 127.1,
+        "work_lat": 37.4,
+        "feedback_min": 10,
+    }
+
+
+def _fire_at(arrive_by=ARRIVE_BY):
+    # default lookahead is 90 minutes
+    return arrive_by - timedelta(minutes=90)
+
+
+def _send_due(timeline, now):
+    due = timeline.pop_due(now)
+    for u in due:
+        timeline.mark_fired(u)
+    return due
+
+
+def test_replan_does_not_add_the_same_check_twice():
+    timeline = CommuteTimeline()
+
+    assert timeline.schedule_all([_user(), _user(user_id=2)]) == 2
+    assert timeline.schedule_all([_user(), _user(user_id=2)]) == 0
+    assert len(timeline) == 2
+
+    due = _send_due(timeline, _fire_at())
+    assert sorted(u["user_id"] for u in due) == [1, 2]
+    assert timeline.pop_due(_fire_at() + timedelta(minutes=1)) == []
+
+
+def test_nothing_fires_before_the_window():
+    timeline = CommuteTimeline()
+    timeline.schedule(_user())
+
+    assert timeline.pop_due(_fire_at() - timedelta(seconds=1)) == []
+    assert timeline.seconds_until_next(NOW) == (_fire_at() - NOW).total_seconds()
+
+
+def test_discard_then_reschedule_same_arrive_by_is_not_sent_twice():
+    timeline = CommuteTimeline()
+    timeline.schedule(_user())
+    assert len(_send_due(timeline, _fire_at())) == 1
+
+    # unrelated profile edit : discard + re-plan of the same user
+    timeline.discard(1)
+    assert timeline.schedule(_user()) is False
+    assert timeline.pop_due(_fire_at() + timedelta(minutes=5)) == []
+
+
+def test_discard_of_a_pending_check_takes_the_new_arrive_by():
+    timeline = CommuteTimeline()
+    timeline.schedule(_user())
+
+    later = ARRIVE_BY + timedelta(minutes=30)
+    timeline.discard(1)
+    assert timeline.schedule(_user(arrive_by=later)) is True
+
+    assert timeline.pop_due(_fire_at()) == []
+    due = timeline.pop_due(_fire_at(later))
+    assert [u["arrive_by"] for u in due] == [later]
+
+
+def test_address_change_sends_again():
+    timeline = CommuteTimeline()
+    timeline.schedule(_user())
+    _send_due(timeline, _fire_at())
+
+    timeline.discard(1)
+    assert timeline.schedule(_user(home_lat=37.6)) is True
+
+    due = _send_due(timeline, _fire_at() + timedelta(minutes=1))
+    assert [u["home_lat"] for u in due] == [37.6]
+
+
+def test_failed_send_is_scheduled_again():
+    timeline = CommuteTimeline()
+    timeline.schedule_all([_user(), _user(user_id=2)])
+
+    # send failed : nothing marked fired, the scheduler puts the users back
+    due = timeline.pop_due(_fire_at())
+    assert timeline.schedule_all(due) == 2
+
+    due = _send_due(timeline, _fire_at() + timedelta(seconds=10))
+    assert sorted(u["user_id"] for u in due) == [1, 2]
+
+
+def test_fired_checks_are_forgotten_once_arrive_by_passes():
+    timeline = CommuteTimeline()
+    timeline.schedule(_user())
+    _send_due(timeline, _fire_at())
+    assert 1 in timeline._fired
+
+    timeline.pop_due(ARRIVE_BY - timedelta(seconds=1))
+    assert 1 in timeline._fired
+
+    timeline.pop_due(ARRIVE_BY)
+    assert timeline._fired == {}
@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from route_kafka.utils import google_api_utils
+from route_kafka.utils.google_api_utils import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GoogleAPIUtils,
+    RateLimiter,
+)
+
+ROUTE = {"routes": [{"duration": "1800s", "distanceMeters": 12000}]}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+        Backoff delays requested by the client, without waiting for them
+    """
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(google_api_utils.asyncio, "sleep", sleep)
+    return delays
+
+
+def _client(monkeypatch, responses, failure_threshold=5, max_retries=4):
+    """
+        GoogleAPIUtils answering from `responses` (httpx.Response or exception), in order
+    """
+    monkeypatch.setattr(google_api_utils, "RATE_LIMITERS", {})
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "test-key")
+    monkeypatch.setenv("GOOGLE_ROUTES_QPS", "1000")
+    monkeypatch.setenv("GOOGLE_ROUTES_BREAKER_FAILURES", str(failure_threshold))
+    monkeypatch.setenv("GOOGLE_ROUTES_BREAKER_RESET_SEC", "30")
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        response = responses[len(calls) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    api = GoogleAPIUtils(max_retries=max_retries)
+    asyncio.run(api.client.aclose())
+    api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return api, calls
+
+
+def _request(api):
+    return asyncio.run(api.request_route_api(127.0, 37.5, 127.1, 37.4, "2026-01-05T09:00:00+09:00"))
+
+
+def _reopen_elapsed(breaker):
+    # as if reset_timeout had passed since the breaker opened
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_retries_429_and_5xx_honoring_retry_after(monkeypatch, sleeps):
+    api, calls = _client(monkeypatch, [
+        httpx.Response(503),
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(200, json=ROUTE),
+    ])
+
+    assert _request(api) == ROUTE
+    assert len(calls) == 3
+    assert calls[0].headers["X-Goog-FieldMask"] == GoogleAPIUtils.DEFAULT_FIELD_MASK
+    assert 0 <= sleeps[0] <= api.backoff_base
+    assert sleeps[1] == 3.0
+    assert api.breaker.failures == 0
+
+
+def test_transport_errors_are_retried(monkeypatch, sleeps):
+    api, calls = _client(monkeypatch, [
+        httpx.ConnectError("refused"),
+        httpx.Response(200, json=ROUTE),
+    ])
+
+    assert _request(api) == ROUTE
+    assert len(calls) == 2
+
+
+def test_4xx_is_not_retried_and_not_an_outage(monkeypatch, sleeps):
+    api, calls = _client(monkeypatch, [httpx.Response(400, json={"error": "bad"})])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _request(api)
+    assert len(calls) == 1
+    assert sleeps == []
+    assert api.breaker.failures == 0
+
+
+def test_breaker_opens_then_recovers_through_half_open(monkeypatch, sleeps):
+    api, calls = _client(
+        monkeypatch,
+        [httpx.Response(503), httpx.Response(503), httpx.Response(200, json=ROUTE)],
+        failure_threshold=2,
+        max_retries=0,
+    )
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="after 1 attempts"):
+            _request(api)
+
+    # open : rejected without calling the API
+    with pytest.raises(CircuitOpenError):
+        _request(api)
+    assert len(calls) == 2
+
+    # half-open : one trial goes through and closes the breaker
+    _reopen_elapsed(api.breaker)
+    assert _request(api) == ROUTE
+    assert api.breaker.opened_at is None
+    assert api.breaker.trial_running is False
+
+
+def test_failed_trial_reopens_the_breaker(monkeypatch, sleeps):
+    api, _ = _client(
+        monkeypatch,
+        [httpx.Response(503), httpx.Response(503), httpx.Response(200, json=ROUTE)],
+        failure_threshold=1,
+        max_retries=0,
+    )
+
+    with pytest.raises(RuntimeError):
+        _request(api)
+    _reopen_elapsed(api.breaker)
+    with pytest.raises(RuntimeError):
+        _request(api)
+
+    # the failed trial restarted the open period
+    with pytest.raises(CircuitOpenError):
+        _request(api)
+    _reopen_elapsed(api.breaker)
+    assert _request(api) == ROUTE
+
+
+def test_non_http_error_releases_the_trial(monkeypatch, sleeps):
+    api, _ = _client(
+        monkeypatch,
+        [
+            httpx.Response(503),
+            httpx.Response(200, content=b"not json"),
+            httpx.Response(200, json=ROUTE),
+        ],
+        failure_threshold=1,
+        max_retries=0,
+    )
+
+    with pytest.raises(RuntimeError):
+        _request(api)
+    _reopen_elapsed(api.breaker)
+
+    # the trial fails while decoding, outside the HTTP error handling
+    with pytest.raises(ValueError):
+        _request(api)
+    assert api.breaker.trial_running is False
+
+    _reopen_elapsed(api.breaker)
+    assert _request(api) == ROUTE
+
+
+def test_breaker_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _reopen_elapsed(breaker)
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_rate_limiter_waits_once_the_burst_is_spent():
+    limiter = RateLimiter(qps=20, burst=2)
+
+    async def acquire(n):
+        started = time.monotonic()
+        for _ in range(n):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire(2)) < 0.04
+    # bucket empty : the next two tokens take 1 / 20 s each
+    assert asyncio.run(acquire(2)) >= 0.09
@@ -0,0 +1,74 @@
+import fakeredis
+import pytest
+
+from route_kafka.utils.redis_route import RedisRoute
+
+PAYLOAD = {
+    "user_id": 7,
+    "depart_at": "2026-01-05T07:40:00+09:00",
+    "arrive_by": "2026-01-05T09:00:00+09:00",
+    "total_duration_sec": 3600,
+    "feedback_min": 10,
+    "route": {
+        "total_duration_sec": 3600,
+        "segments": [
+            {"type": "walk", "duration_sec": 300, "polyline": "abc"},
+            {"type": "subway", "duration_sec": 3300, "line": "2호선", "polyline": "def"},
+        ],
+    },
+    "generated_at": "2026-01-05T07:00:00+09:00",
+}
+
+
+@pytest.fixture
+def route_state(monkeypatch):
+    # fastapi runs from its own directory
+    monkeypatch.syspath_prepend("fastapi")
+    import route_state
+
+    return route_state
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+def test_worker_state_is_read_by_the_api(route_state, client):
+    RedisRoute(client).set(PAYLOAD["user_id"], PAYLOAD)
+
+    assert route_state.get_route_state(client, 7) == PAYLOAD
+    assert route_state.get_route_summary(client, 7) == {
+        k: v for k, v in PAYLOAD.items() if k != "route"
+    }
+
+    without_polylines = route_state.get_route_state(client, 7, include_polylines=False)
+    assert all("polyline" not in s for s in without_polylines["route"]["segments"])
+
+
+def test_api_state_is_read_by_the_worker(route_state, client):
+    route_state.set_route_state(client, PAYLOAD["user_id"], PAYLOAD)
+
+    repo = RedisRoute(client)
+    assert repo.get(7) == PAYLOAD
+    assert repo.get_summary(7)["user_id"] == 7
+    assert client.ttl("route:polyline:7") == RedisRoute.TTL
+
+
+def test_partial_state_keeps_missing_fields_empty(route_state, client):
+    # POST /api/v1/route without arrive_by / route
+    payload = {"user_id": 7, "depart_at": PAYLOAD["depart_at"], "generated_at": PAYLOAD["generated_at"]}
+    route_state.set_route_state(client, 7, payload)
+
+    state = RedisRoute(client).get(7)
+    assert state["user_id"] == 7
+    assert state["arrive_by"] is None
+    assert state["route"] is None
+    assert not client.exists("route:polyline:7")
+
+
+def test_legacy_json_string_is_still_readable(route_state, client):
+    client.set("route:state:7", '{"user_id": 7, "depart_at": "2026-01-05T07:40:00+09:00"}')
+
+    assert route_state.get_route_summary(client, 7)["depart_at"] == PAYLOAD["depart_at"]
+    assert RedisRoute(client).get(7)["user_id"] == 7
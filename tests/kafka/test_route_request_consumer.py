@@ -0,0 +1,58 @@
+import asyncio
+
+from route_kafka.consumers.route_request_consumer import RouteKafkaConsumer
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.saved = {}
+
+    def get_summary(self, user_id):
+        return None
+
+    def set(self, user_id, payload):
+        self.saved[user_id] = payload
+
+
+class _FakeRouteService:
+    def __init__(self, fail_users=()):
+        self.requests = []
+        self.fail_users = set(fail_users)
+
+    async def fetch_route(self, message):
+        self.requests.append(message)
+        if message["user_id"] in self.fail_users:
+            raise RuntimeError("Routes API failed")
+        return {"total_duration_sec": 1800, "segments": []}
+
+
+def _consumer(route_service):
+    # no KafkaConsumer : handle_batch only needs redis and the route service
+    consumer = RouteKafkaConsumer.__new__(RouteKafkaConsumer)
+    consumer.redis = _FakeRedis()
+    consumer.route_service = route_service
+    return consumer
+
+
+def _message(user_id, arrive_by="2099-01-05T09:00:00+09:00"):
+    return {"user_id": user_id, "arrive_by": arrive_by, "feedback_time_sec": 0}
+
+
+def test_handle_batch_requests_each_user_once_with_the_latest_message():
+    service = _FakeRouteService()
+    consumer = _consumer(service)
+    later = "2099-01-05T09:30:00+09:00"
+
+    asyncio.run(consumer.handle_batch([_message(1), _message(2), _message(1, later)]))
+
+    assert sorted(m["user_id"] for m in service.requests) == [1, 2]
+    assert consumer.redis.saved[1]["arrive_by"] == later
+
+
+def test_handle_batch_failure_does_not_fail_other_users():
+    service = _FakeRouteService(fail_users={1})
+    consumer = _consumer(service)
+
+    asyncio.run(consumer.handle_batch([_message(1), _message(2)]))
+
+    assert list(consumer.redis.saved) == [2]
@@ -1,2 +1,152 @@
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+
 def temp_test_spark():
-    assert True
\ No newline at end of file
+    assert True
+
+
+@pytest.fixture(scope="module")
+def spark():
+    pytest.importorskip("pyspark")
+    if shutil.which("java") is None:
+        pytest.skip("java runtime is required for a local spark session")
+
+    from pyspark.sql import SparkSession
+
+    # Python workers must run the driver's interpreter (same minor version)
+    os.environ.setdefault("PYSPARK_PYTHON", sys.executable)
+    session = (
+        SparkSession.builder
+        .master("local[1]")
+        .appName("test_spark")
+        .config("spark.ui.enabled", "false")
+        .getOrCreate()
+    )
+    yield session
+    session.stop()
+
+
+def _weather_df(spark):
+    return spark.createDataFrame(
+        [
+            ("2026-01-01 08:00", datetime(2026, 1, 1, 8), "2026010108", "108",
+             1.2, -3.0, 40.0, 0.0, 0.0, "", 10, 1, "[]", "1"),
+        ],
+        "obs_time string, obs_ts timestamp, obs_yyyymmddhh string, stn_id string, "
+        "ws double, ta double, hm double, rn double, sd_tot double, wc string, "
+        "pop int, sky int, music_json string, weather_code string",
+    )
+
+
+def _stub_tiers(spark, recommender):
+    book = ("title", "author", "category", "description", "isbn", "link")
+    fields = ["title", "author", "categoryName", "description", "ebook_isbn13", "ebook_link"]
+
+    recommender._tier1_top_by_genre_df = spark.createDataFrame(
+        [("한국소설",) + book], ["tier1_genre"] + [f"tier1_{f}" for f in fields]
+    )
+    recommender._tier2_top_by_rep_df = spark.createDataFrame(
+        [("LITERATURE_FICTION",) + book], ["tier2_rep_genre"] + [f"tier2_{f}" for f in fields]
+    )
+    recommender._tier3_global_top_df = spark.createDataFrame(
+        [book], [f"tier3_{f}" for f in fields]
+    )
+    recommender._checked_at = time.monotonic()
+
+
+def test_book_recommendation_plan_has_no_python_udf(spark):
+    from spark.utils.book_recommender import BookRecommender
+
+    recommender = BookRecommender(spark=spark, bucket="test-bucket")
+    _stub_tiers(spark, recommender)
+
+    df = recommender.add_recommendation(_weather_df(spark))
+    plan = df._jdf.queryExecution().executedPlan().toString()
+
+    assert "BatchEvalPython" not in plan
+    assert "ArrowEvalPython" not in plan
+    assert df.first()["title"] == "title"
+
+
+def test_preprocessing_kma_weather_parses_raw_line(spark):
+    from spark.utils.spark_utils import Spark_utils
+
+    # whitespace-aligned KMA line : ws(3) and sd_tot(21) missing, wc(22) missing, ca_tot(25) clear
+    fields = ["0"] * 30
+    fields[0], fields[1] = "202607011400", "108"
+    fields[3], fields[11], fields[13], fields[15] = "-9", "31.5", "55", "0.0"
+    fields[21], fields[22], fields[25] = "-9", "-99", "0"
+    message = json.dumps({"raw_line": "   ".join(fields), "obs_time": "202607011400", "stn_id": "108"})
+
+    raw = spark.createDataFrame([(message.encode("utf-8"),)], "value binary")
+    row = Spark_utils.__new__(Spark_utils).preprocessing_kma_weather(raw).first()
+
+    assert row["obs_yyyymmddhh"] == "2026070114"
+    assert (row["ws"], row["ta"], row["hm"], row["sd_tot"]) == (0.0, 31.5, 55.0, 0.0)
+    assert (row["wc"], row["pop"], row["sky"]) == (-99, 0, 1)
+    assert row["weather_code"] == "여름-오후-더위"
+
+
+def test_available_now_reads_kafka_from_earliest():
+    pytest.importorskip("pyspark")
+    from spark.utils.stream_config import AVAILABLE_NOW, StreamConfig
+
+    assert StreamConfig("weather", trigger=AVAILABLE_NOW).kafka_options()["offset"] == "earliest"
+    assert StreamConfig("weather", trigger="1 minute").kafka_options()["offset"] == "latest"
+
+
+def test_record_progress_and_push_metrics():
+    pytest.importorskip("pyspark")
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from spark.utils.streaming_metrics import (
+        MetricsRegistry,
+        push_metrics,
+        record_progress,
+    )
+
+    registry = MetricsRegistry()
+    registry.record_sink("redis", "kma-stn", 12.5, rows=3)
+    summary = record_progress("weather", [
+        {"batchId": 0, "numInputRows": 5, "durationMs": {"triggerExecution": 100, "addBatch": 60}},
+        {"batchId": 1, "numInputRows": 2, "durationMs": {"triggerExecution": 40, "addBatch": 20}},
+    ], registry)
+
+    assert summary == {
+        "query": "weather", "batches": 2, "input_rows": 7,
+        "trigger_ms": 140, "add_batch_ms": 80, "last_batch_id": 1,
+    }
+    assert registry.snapshot()["queries"]["weather"]["spark_streaming_latest_batch_id"] == 1
+
+    pushed = {}
+
+    class Gateway(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            pushed["path"] = self.path
+            pushed["body"] = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Gateway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        assert push_metrics("weather_available_now", "weather", registry, url=url)
+    finally:
+        server.shutdown()
+
+    assert pushed["path"] == "/metrics/job/weather_available_now/instance/weather"
+    assert 'spark_streaming_input_rows{query="weather"} 2' in pushed["body"]
+    assert 'spark_sink_rows_total{sink="redis",target="kma-stn"} 3' in pushed["body"]
+    assert push_metrics("weather_available_now", "weather", registry, url="") is False